@@ -1,3 +1,18 @@
 from django.contrib import admin
+from .models import DailySales, DailyMenuItemSales, DailyCategorySales
 
-# Register your models here.
+@admin.register(DailySales)
+class DailySalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'order_type', 'status', 'orders_count', 'revenue']
+    list_filter = ['order_type', 'status', 'date']
+
+@admin.register(DailyMenuItemSales)
+class DailyMenuItemSalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'item_name', 'quantity', 'revenue']
+    list_filter = ['date']
+    search_fields = ['item_name']
+
+@admin.register(DailyCategorySales)
+class DailyCategorySalesAdmin(admin.ModelAdmin):
+    list_display = ['date', 'category', 'quantity', 'revenue']
+    list_filter = ['category', 'date']
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from analytics.rollups import refresh_top_sellers
+
+
+class Command(BaseCommand):
+    help = 'Re-rank the top sellers windows from the hourly sales buckets'
+    
+    def handle(self, *args, **options):
+        refresh_top_sellers()
+        self.stdout.write(self.style.SUCCESS('Refreshed top sellers'))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('menu', '0006_menuitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyCategorySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(blank=True, max_length=100)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily category sales',
+                'ordering': ['-date', 'category'],
+                'unique_together': {('date', 'category')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailySales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('order_type', models.CharField(max_length=20)),
+                ('status', models.CharField(max_length=20)),
+                ('orders_count', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+            ],
+            options={
+                'verbose_name_plural': 'Daily sales',
+                'ordering': ['-date', 'order_type', 'status'],
+                'unique_together': {('date', 'order_type', 'status')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyMenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('item_name', models.CharField(blank=True, max_length=255)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('menu_item', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to='menu.menuitem')),
+            ],
+            options={
+                'verbose_name_plural': 'Daily menu item sales',
+                'ordering': ['-date', '-quantity'],
+                'indexes': [models.Index(fields=['date'], name='analytics_d_date_6c7245_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+        ('menu', '0006_menuitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HourlyMenuItemSales',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hourly_sales', to='menu.menuitem')),
+            ],
+            options={
+                'ordering': ['-hour'],
+                'unique_together': {('hour', 'menu_item')},
+            },
+        ),
+        migrations.CreateModel(
+            name='TopSeller',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('window', models.CharField(choices=[('24h', 'Last 24 hours'), ('7d', 'Last 7 days'), ('30d', 'Last 30 days')], max_length=10)),
+                ('rank', models.PositiveIntegerField()),
+                ('quantity', models.PositiveIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='top_seller_ranks', to='menu.menuitem')),
+            ],
+            options={
+                'ordering': ['window', 'rank'],
+                'unique_together': {('window', 'rank')},
+            },
+        ),
+    ]
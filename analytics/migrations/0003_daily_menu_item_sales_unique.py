@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:50
+
+from django.db import migrations
+
+
+def merge_duplicate_rows(apps, schema_editor):
+    """Rows were keyed on (menu item, name); fold renamed items into one row per day"""
+    DailyMenuItemSales = apps.get_model('analytics', 'DailyMenuItemSales')
+    kept = {}
+    for row in DailyMenuItemSales.objects.filter(menu_item__isnull=False).order_by('date', 'menu_item', 'id'):
+        key = (row.date, row.menu_item_id)
+        if key not in kept:
+            kept[key] = row
+            continue
+        first = kept[key]
+        first.quantity += row.quantity
+        first.revenue += row.revenue
+        first.save(update_fields=['quantity', 'revenue'])
+        row.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_hourly_sales_top_sellers'),
+        ('menu', '0007_menuitem_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_rows, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='dailymenuitemsales',
+            name='analytics_d_date_6c7245_idx',
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailymenuitemsales',
+            unique_together={('date', 'menu_item')},
+        ),
+    ]
@@ -1,3 +1,84 @@
 from django.db import models
 
-# Create your models here.
+class DailySales(models.Model):
+    """Order count and revenue rolled up per day, order type and status"""
+    date = models.DateField()
+    order_type = models.CharField(max_length=20)
+    status = models.CharField(max_length=20)
+    orders_count = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date', 'order_type', 'status']
+        unique_together = ['date', 'order_type', 'status']
+        verbose_name_plural = 'Daily sales'
+    
+    def __str__(self):
+        return f"{self.date} {self.order_type}/{self.status}: {self.orders_count} orders"
+
+class DailyMenuItemSales(models.Model):
+    """Quantity and revenue per menu item per day (cancelled orders excluded)"""
+    date = models.DateField()
+    menu_item = models.ForeignKey(
+        'menu.MenuItem', on_delete=models.SET_NULL, related_name='daily_sales', null=True, blank=True
+    )
+    item_name = models.CharField(max_length=255, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date', '-quantity']
+        unique_together = ['date', 'menu_item']
+        verbose_name_plural = 'Daily menu item sales'
+    
+    def __str__(self):
+        return f"{self.date} {self.item_name}: {self.quantity}"
+
+class DailyCategorySales(models.Model):
+    """Quantity and revenue per cached item category per day (cancelled orders excluded)"""
+    date = models.DateField()
+    category = models.CharField(max_length=100, blank=True)
+    quantity = models.PositiveIntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    class Meta:
+        ordering = ['-date', 'category']
+        unique_together = ['date', 'category']
+        verbose_name_plural = 'Daily category sales'
+    
+    def __str__(self):
+        return f"{self.date} {self.category}: {self.quantity}"
+
+class HourlyMenuItemSales(models.Model):
+    """Quantity sold per menu item per hour - the buckets behind the top sellers windows"""
+    hour = models.DateTimeField()
+    menu_item = models.ForeignKey('menu.MenuItem', on_delete=models.CASCADE, related_name='hourly_sales')
+    quantity = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        ordering = ['-hour']
+        unique_together = ['hour', 'menu_item']
+    
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H:00} {self.menu_item_id}: {self.quantity}"
+
+class TopSeller(models.Model):
+    """Materialized best-seller ranking for a sliding window"""
+    WINDOW_CHOICES = [
+        ('24h', 'Last 24 hours'),
+        ('7d', 'Last 7 days'),
+        ('30d', 'Last 30 days'),
+    ]
+    
+    window = models.CharField(max_length=10, choices=WINDOW_CHOICES)
+    rank = models.PositiveIntegerField()
+    menu_item = models.ForeignKey('menu.MenuItem', on_delete=models.CASCADE, related_name='top_seller_ranks')
+    quantity = models.PositiveIntegerField(default=0)
+    computed_at = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['window', 'rank']
+        unique_together = ['window', 'rank']
+    
+    def __str__(self):
+        return f"{self.window} #{self.rank}: {self.menu_item_id}"
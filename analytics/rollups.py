@@ -0,0 +1,383 @@
+import logging
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, Min, Max, F, DecimalField
+from django.utils import timezone
+
+from orders.models import Order, OrderItem
+from .models import (
+    DailySales, DailyMenuItemSales, DailyCategorySales, HourlyMenuItemSales, TopSeller
+)
+
+logger = logging.getLogger(__name__)
+
+TOP_SELLER_WINDOWS = {
+    '24h': timedelta(hours=24),
+    '7d': timedelta(days=7),
+    '30d': timedelta(days=30),
+}
+TOP_SELLER_LIMIT = 20
+CENT = Decimal('0.01')
+
+
+def day_range(day):
+    """Aware [start, end) datetimes covering a local calendar day"""
+    start = timezone.make_aware(datetime.combine(day, time.min))
+    return start, start + timedelta(days=1)
+
+
+def order_day(order):
+    """The local calendar day an order's figures are rolled up under"""
+    return timezone.localdate(order.created_at)
+
+
+def truncate_hour(moment):
+    return moment.replace(minute=0, second=0, microsecond=0)
+
+
+def sync_rows(queryset, rows, key_fields, value_fields):
+    """
+    Make ``queryset`` hold exactly ``rows``: upsert the rows that are new or
+    whose figures changed and delete the ones no longer produced. Rows are
+    matched on ``key_fields`` (the model's unique key), so two refreshes of
+    the same period update each other's rows instead of colliding on insert.
+    """
+    model = queryset.model
+    keys = [model._meta.get_field(name).attname for name in key_fields]
+    values = [model._meta.get_field(name).attname for name in value_fields]
+    
+    def key(row):
+        return tuple(getattr(row, name) for name in keys)
+    
+    current = {key(row): row for row in queryset}
+    changed = []
+    for row in rows:
+        existing = current.pop(key(row), None)
+        if existing is None or any(getattr(existing, name) != getattr(row, name) for name in values):
+            changed.append(row)
+    
+    if current:
+        model.objects.filter(pk__in=[row.pk for row in current.values()]).delete()
+    if changed:
+        model.objects.bulk_create(
+            changed, update_conflicts=True, unique_fields=key_fields, update_fields=value_fields
+        )
+
+
+def money(value):
+    return (value or Decimal('0')).quantize(CENT)
+
+
+def line_total(prefix=''):
+    """Sum of ``price_at_time * quantity`` over order lines (``prefix`` reaches them through a relation)"""
+    return Sum(
+        F(f'{prefix}price_at_time') * F(f'{prefix}quantity'),
+        output_field=DecimalField(max_digits=12, decimal_places=2)
+    )
+
+
+def refresh_day(day):
+    """
+    Bring one day's rollup rows in line with that day's orders, rewriting
+    only the rows whose figures changed. Used by rebuilds and to recover
+    from drift; order writes apply per-order deltas instead (RollupBatch).
+    
+    Revenue is summed from the lines rather than ``Order.total_amount``,
+    which is written after the line's own post_save has already fired.
+    """
+    start, end = day_range(day)
+    orders = Order.objects.filter(created_at__gte=start, created_at__lt=end).order_by()
+    # Item and category figures only count orders that were not cancelled
+    items = OrderItem.objects.filter(
+        order__created_at__gte=start, order__created_at__lt=end
+    ).exclude(order__status='cancelled').order_by()
+    
+    sales = [
+        DailySales(
+            date=day, order_type=row['order_type'], status=row['status'],
+            orders_count=row['orders_count'], revenue=money(row['total_revenue'])
+        )
+        for row in orders.values('order_type', 'status').annotate(
+            orders_count=Count('id', distinct=True),
+            total_revenue=line_total('items__'),
+        )
+    ]
+    # Lines without a menu item have no row of their own; they still count per category
+    item_sales = [
+        DailyMenuItemSales(
+            date=day, menu_item_id=row['menu_item'], item_name=row['item_name'],
+            quantity=row['total_quantity'], revenue=money(row['total_revenue'])
+        )
+        for row in items.filter(menu_item__isnull=False).values('menu_item').annotate(
+            item_name=Max('cached_item_name'), total_quantity=Sum('quantity'), total_revenue=line_total()
+        )
+    ]
+    category_sales = [
+        DailyCategorySales(
+            date=day, category=row['cached_item_category'],
+            quantity=row['total_quantity'], revenue=money(row['total_revenue'])
+        )
+        for row in items.values('cached_item_category').annotate(
+            total_quantity=Sum('quantity'), total_revenue=line_total()
+        )
+    ]
+    
+    with transaction.atomic():
+        sync_rows(
+            DailySales.objects.filter(date=day), sales,
+            ['date', 'order_type', 'status'], ['orders_count', 'revenue']
+        )
+        sync_rows(
+            DailyMenuItemSales.objects.filter(date=day), item_sales,
+            ['date', 'menu_item'], ['item_name', 'quantity', 'revenue']
+        )
+        sync_rows(
+            DailyCategorySales.objects.filter(date=day), category_sales,
+            ['date', 'category'], ['quantity', 'revenue']
+        )
+
+
+def refresh_hour(hour):
+    """Bring the per-item sales buckets for one hour in line with that hour's orders"""
+    rows = OrderItem.objects.filter(
+        order__created_at__gte=hour,
+        order__created_at__lt=hour + timedelta(hours=1),
+        menu_item__isnull=False,
+    ).exclude(order__status='cancelled').order_by().values('menu_item').annotate(
+        total_quantity=Sum('quantity')
+    )
+    buckets = [
+        HourlyMenuItemSales(hour=hour, menu_item_id=row['menu_item'], quantity=row['total_quantity'])
+        for row in rows
+    ]
+    
+    with transaction.atomic():
+        sync_rows(HourlyMenuItemSales.objects.filter(hour=hour), buckets, ['hour', 'menu_item'], ['quantity'])
+
+
+def refresh_top_sellers():
+    """
+    Re-rank every window from the hourly buckets (at most 720 hours of rows).
+    
+    Runs whenever committed orders change the buckets, and from top_sellers()
+    once the windows have slid past the last ranking.
+    """
+    current_hour = truncate_hour(timezone.now())
+    rankings = []
+    for window, span in TOP_SELLER_WINDOWS.items():
+        rows = HourlyMenuItemSales.objects.filter(hour__gt=current_hour - span).values(
+            'menu_item'
+        ).annotate(total_quantity=Sum('quantity')).order_by('-total_quantity', 'menu_item')
+        rankings.extend(
+            TopSeller(
+                window=window, rank=rank, menu_item_id=row['menu_item'],
+                quantity=row['total_quantity'], computed_at=current_hour
+            )
+            for rank, row in enumerate(rows[:TOP_SELLER_LIMIT], start=1)
+        )
+    
+    with transaction.atomic():
+        sync_rows(TopSeller.objects.all(), rankings, ['window', 'rank'], ['menu_item', 'quantity', 'computed_at'])
+
+
+def top_sellers(window):
+    """
+    Return ``(menu_item_id, quantity)`` pairs for a window, best seller first.
+    
+    Reads the materialized ranking. A ranking computed before the current
+    hour may still count sales that have since left the window, so it is
+    re-ranked first; an empty list when nothing sold in the window.
+    """
+    rankings = TopSeller.objects.filter(window=window).values_list('menu_item_id', 'quantity', 'computed_at')
+    rows = list(rankings)
+    if rows and rows[0][2] < truncate_hour(timezone.now()):
+        refresh_top_sellers()
+        rows = list(rankings.all())
+    return [(menu_item_id, quantity) for menu_item_id, quantity, _ in rows]
+
+
+# Per rollup: the fields of its unique key, and the count that drops a row once it reaches zero
+ROLLUP_ROWS = {
+    DailySales: (('date', 'order_type', 'status'), 'orders_count'),
+    DailyMenuItemSales: (('date', 'menu_item_id'), 'quantity'),
+    DailyCategorySales: (('date', 'category'), 'quantity'),
+    HourlyMenuItemSales: (('hour', 'menu_item_id'), 'quantity'),
+}
+
+
+class RollupDrift(Exception):
+    """A delta does not fit the stored rollups, which were already out of step with the orders"""
+
+
+def order_share(order_id):
+    """
+    The figures one order contributes to the rollups.
+    
+    Returns ``(figures, labels)``, both keyed by ``(model, key)`` with ``key``
+    holding the values of the model's unique fields. ``labels`` are the
+    non-additive fields (item names) a new row is inserted with.
+    """
+    order = Order.objects.filter(pk=order_id).values('created_at', 'order_type', 'status').first()
+    if order is None:
+        return {}, {}
+    day = timezone.localdate(order['created_at'])
+    hour = truncate_hour(order['created_at'])
+    lines = OrderItem.objects.filter(order_id=order_id).order_by().values(
+        'menu_item', 'cached_item_name', 'cached_item_category'
+    ).annotate(total_quantity=Sum('quantity'), total_revenue=line_total())
+    
+    figures, labels = {}, {}
+    
+    def add(model, key, **values):
+        row = figures.setdefault((model, key), dict.fromkeys(values, 0))
+        for name, value in values.items():
+            row[name] += value
+    
+    revenue = Decimal('0')
+    for line in lines:
+        quantity, line_revenue = line['total_quantity'], money(line['total_revenue'])
+        revenue += line_revenue
+        # Item and category figures only count orders that were not cancelled
+        if order['status'] == 'cancelled':
+            continue
+        add(DailyCategorySales, (day, line['cached_item_category']), quantity=quantity, revenue=line_revenue)
+        if line['menu_item'] is not None:
+            add(DailyMenuItemSales, (day, line['menu_item']), quantity=quantity, revenue=line_revenue)
+            add(HourlyMenuItemSales, (hour, line['menu_item']), quantity=quantity)
+            labels[(DailyMenuItemSales, (day, line['menu_item']))] = {'item_name': line['cached_item_name']}
+    add(DailySales, (day, order['order_type'], order['status']), orders_count=1, revenue=revenue)
+    return figures, labels
+
+
+def add_to_row(model, key, delta, labels):
+    """Add ``delta`` to one rollup row, inserting it if missing and deleting it once its count is zero"""
+    key_fields, count_field = ROLLUP_ROWS[model]
+    lookup = dict(zip(key_fields, key))
+    rows = model.objects.filter(**lookup)
+    increments = {name: F(name) + value for name, value in delta.items()}
+    if rows.update(**increments):
+        if delta[count_field] < 0:
+            rows.filter(**{count_field: 0}).delete()
+        return
+    if delta[count_field] <= 0:
+        raise RollupDrift(f"No {model.__name__} row {key} to take {delta} from")
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **delta, **labels)
+    except IntegrityError:
+        # Another process inserted the row first
+        rows.update(**increments)
+
+
+def apply_deltas(deltas, labels):
+    """
+    Add ``{(model, key): delta}`` to the rollup rows in one transaction.
+    
+    Should the stored rows have drifted from the orders (a negative count,
+    a missing row), the days and hours involved are rebuilt from scratch.
+    """
+    try:
+        with transaction.atomic():
+            for (model, key), delta in deltas.items():
+                add_to_row(model, key, delta, labels.get((model, key), {}))
+    except (IntegrityError, RollupDrift) as e:
+        logger.warning(f"Sales rollups out of step, rebuilding: {str(e)}")
+        for day in sorted({key[0] for model, key in deltas if model is not HourlyMenuItemSales}):
+            refresh_day(day)
+        for hour in sorted({key[0] for model, key in deltas if model is HourlyMenuItemSales}):
+            refresh_hour(hour)
+
+
+class RollupBatch:
+    """
+    The orders one transaction writes to, each with the share of the rollups
+    it had before the first write. Called once the transaction commits, it
+    adds the difference to the share each order has now - so a save touches
+    only the rollup rows of its own order, never a whole day.
+    """
+    
+    def __init__(self):
+        self.before = {}
+        self.done = False
+    
+    def track(self, order_id, new=False):
+        if order_id is not None and order_id not in self.before:
+            self.before[order_id] = ({}, {}) if new else order_share(order_id)
+    
+    def __call__(self):
+        self.done = True
+        deltas, labels = {}, {}
+        for order_id, (before, _) in self.before.items():
+            after, after_labels = order_share(order_id)
+            labels.update(after_labels)
+            for target in before.keys() | after.keys():
+                old, new = before.get(target, {}), after.get(target, {})
+                delta = {name: new.get(name, 0) - old.get(name, 0) for name in old.keys() | new.keys()}
+                if any(delta.values()):
+                    merged = deltas.setdefault(target, dict.fromkeys(delta, 0))
+                    for name, value in delta.items():
+                        merged[name] += value
+        self.before = {}
+        deltas = {target: delta for target, delta in deltas.items() if any(delta.values())}
+        if deltas:
+            apply_deltas(deltas, labels)
+        if any(model is HourlyMenuItemSales for model, _ in deltas):
+            refresh_top_sellers()
+
+
+def pending_batch(using):
+    """The batch of the transaction open on ``using``, registered to run when it commits"""
+    connection = transaction.get_connection(using)
+    if not connection.in_atomic_block:
+        # Autocommit: the write commits by itself, so track_order's caller flushes right after it
+        return RollupBatch()
+    for _, callback, *_ in connection.run_on_commit:
+        if isinstance(callback, RollupBatch) and not callback.done:
+            return callback
+    batch = RollupBatch()
+    transaction.on_commit(batch, using)
+    return batch
+
+
+def track_order(instance, order_id, using, new=False):
+    """
+    Before ``instance`` is saved or deleted, note that the write changes
+    ``order_id``'s share of the rollups (``new`` when the order is being created).
+    """
+    batch = pending_batch(using)
+    batch.track(order_id, new)
+    instance._rollup_batch = batch
+
+
+def flush_tracked(instance, using):
+    """After the write: outside a transaction it is already committed, so apply it now"""
+    batch = instance.__dict__.pop('_rollup_batch', None)
+    if batch is not None and not transaction.get_connection(using).in_atomic_block:
+        batch()
+
+
+def rebuild(start=None, end=None):
+    """Rebuild the rollups for every day from ``start`` to ``end`` (default: all orders); returns days rebuilt"""
+    bounds = Order.objects.order_by().aggregate(first=Min('created_at'), last=Max('created_at'))
+    if bounds['first'] is None and not (start and end):
+        # Nothing to aggregate - just drop whatever is left over
+        for model in (DailySales, DailyMenuItemSales, DailyCategorySales, HourlyMenuItemSales):
+            model.objects.all().delete()
+        refresh_top_sellers()
+        return 0
+    
+    day = start or timezone.localdate(bounds['first'])
+    last = end or timezone.localdate(bounds['last'])
+    count = 0
+    while day <= last:
+        refresh_day(day)
+        hour, day_end = day_range(day)
+        while hour < day_end:
+            refresh_hour(hour)
+            hour += timedelta(hours=1)
+        day += timedelta(days=1)
+        count += 1
+    refresh_top_sellers()
+    return count
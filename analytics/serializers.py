@@ -0,0 +1,17 @@
+from rest_framework import serializers
+from .models import DailySales, DailyMenuItemSales, DailyCategorySales
+
+class DailySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailySales
+        fields = ['date', 'order_type', 'status', 'orders_count', 'revenue']
+
+class DailyMenuItemSalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyMenuItemSales
+        fields = ['date', 'menu_item', 'item_name', 'quantity', 'revenue']
+
+class DailyCategorySalesSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = DailyCategorySales
+        fields = ['date', 'category', 'quantity', 'revenue']
@@ -0,0 +1,26 @@
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from orders.models import Order, OrderItem
+from .rollups import track_order, flush_tracked
+
+
+@receiver(pre_save, sender=Order)
+@receiver(pre_delete, sender=Order)
+def order_changing(sender, instance, using, **kwargs):
+    track_order(instance, instance.pk, using, new=instance._state.adding)
+
+
+@receiver(pre_save, sender=OrderItem)
+@receiver(pre_delete, sender=OrderItem)
+def order_item_changing(sender, instance, using, **kwargs):
+    # Lines roll up under their order
+    track_order(instance, instance.order_id, using)
+
+
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_changed(sender, instance, using, **kwargs):
+    flush_tracked(instance, using)
@@ -1,3 +1,218 @@
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from menu.models import MenuItem
+from menu.testing import make_menu_item
+from orders.models import Order, OrderItem
+from users.models import CustomUser
+from .models import DailySales, DailyMenuItemSales, DailyCategorySales, HourlyMenuItemSales, TopSeller
+from .rollups import refresh_day, refresh_hour, top_sellers, truncate_hour
+
+
+class RollupTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.dishes = [make_menu_item('Soup', price='4.50'), make_menu_item('Stew', price='12.00')]
+        self.today = timezone.localdate()
+
+    def place_order(self, lines, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer_name='Ada', customer_email='ada@example.com', **fields)
+        for dish, quantity in lines:
+            with self.captureOnCommitCallbacks(execute=True):
+                OrderItem.objects.create(order=order, menu_item=dish, quantity=quantity)
+        return order
+
+
+class DailyRollupTests(RollupTestCase):
+    """Saving orders and lines keeps the day's rollup rows in step"""
+
+    def test_rollups_follow_order_lines(self):
+        soup, stew = self.dishes
+        self.place_order([(soup, 2), (stew, 1)])
+        self.place_order([(soup, 1)], order_type='pickup')
+
+        sales = {row.order_type: row for row in DailySales.objects.filter(date=self.today)}
+        self.assertEqual(sales['delivery'].orders_count, 1)
+        self.assertEqual(sales['delivery'].revenue, Decimal('21.00'))
+        self.assertEqual(sales['pickup'].orders_count, 1)
+        self.assertEqual(sales['pickup'].revenue, Decimal('4.50'))
+
+        items = {row.menu_item_id: row for row in DailyMenuItemSales.objects.filter(date=self.today)}
+        self.assertEqual(items[soup.id].quantity, 3)
+        self.assertEqual(items[soup.id].revenue, Decimal('13.50'))
+        self.assertEqual(items[stew.id].quantity, 1)
+        self.assertEqual(items[stew.id].item_name, 'Stew')
+
+        category = DailyCategorySales.objects.get(date=self.today)
+        self.assertEqual(category.quantity, 4)
+        self.assertEqual(category.revenue, Decimal('25.50'))
+
+    def test_cancelled_order_leaves_item_rollups(self):
+        soup, stew = self.dishes
+        self.place_order([(soup, 1)])
+        order = self.place_order([(stew, 2)])
+
+        order.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+
+        statuses = set(DailySales.objects.filter(date=self.today).values_list('status', flat=True))
+        self.assertEqual(statuses, {'pending', 'cancelled'})
+        self.assertEqual(
+            list(DailyMenuItemSales.objects.filter(date=self.today).values_list('menu_item_id', flat=True)),
+            [soup.id]
+        )
+        self.assertEqual(DailyCategorySales.objects.get(date=self.today).revenue, Decimal('4.50'))
+
+    def test_revenue_does_not_wait_for_order_total(self):
+        order = self.place_order([(self.dishes[1], 2)])
+        # The line's post_save fires before calculate_total() writes the total
+        Order.objects.filter(id=order.id).update(total_amount=0)
+        refresh_day(self.today)
+        self.assertEqual(DailySales.objects.get(date=self.today).revenue, Decimal('24.00'))
+
+    def assert_in_step(self):
+        """The incrementally kept rows match a rebuild of the day from scratch"""
+        with CaptureQueriesContext(connection) as queries:
+            refresh_day(self.today)
+            refresh_hour(truncate_hour(timezone.now()))
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+    def test_deltas_follow_every_kind_of_write(self):
+        soup, stew = MenuItem.objects.select_related('category').order_by('name')
+        self.place_order([(soup, 2)])
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk = Order.create_with_items(
+                [{'menu_item': stew, 'quantity': 3}, {'menu_item': soup, 'quantity': 1}],
+                customer_name='Bo', customer_email='bo@example.com', order_type='pickup'
+            )
+        order = self.place_order([(stew, 1), (soup, 1)])
+        self.assert_in_step()
+
+        line = order.items.get(menu_item=stew)
+        line.quantity = 4
+        with self.captureOnCommitCallbacks(execute=True):
+            line.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.items.get(menu_item=soup).delete()
+        self.assert_in_step()
+
+        bulk.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk.save()
+        self.assert_in_step()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.delete()
+        self.assert_in_step()
+        self.assertEqual(DailyMenuItemSales.objects.get(date=self.today).quantity, 2)
+
+    def test_saving_an_order_does_not_rescan_the_day(self):
+        def queries_to_place_order():
+            with CaptureQueriesContext(connection) as queries:
+                self.place_order([(self.dishes[0], 1)])
+            return len(queries)
+
+        # Once the day's rows exist, each order costs the same however busy the day is
+        self.place_order([(self.dishes[0], 1)])
+        first = queries_to_place_order()
+        for _ in range(5):
+            self.place_order([(self.dishes[1], 1)])
+        self.assertEqual(queries_to_place_order(), first)
+
+    def test_drifted_rollups_are_rebuilt(self):
+        order = self.place_order([(self.dishes[0], 1)])
+        DailyMenuItemSales.objects.all().delete()
+        order.status = 'cancelled'
+        with self.assertLogs('analytics.rollups', 'WARNING'):
+            with self.captureOnCommitCallbacks(execute=True):
+                order.save()
+        self.assertEqual(DailySales.objects.get(date=self.today).status, 'cancelled')
+        self.assertFalse(DailyCategorySales.objects.exists())
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        self.place_order([(self.dishes[0], 1), (self.dishes[1], 1)])
+        with CaptureQueriesContext(connection) as queries:
+            refresh_day(self.today)
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+        self.assertEqual(writes, [])
+
+
+class TopSellerTests(RollupTestCase):
+    """Committed orders re-rank the windows; reads re-rank once the windows have slid"""
+
+    def test_orders_rank_every_window(self):
+        soup, stew = self.dishes
+        self.place_order([(soup, 1), (stew, 2)])
+        for window in ('24h', '7d', '30d'):
+            self.assertEqual(top_sellers(window), [(stew.id, 2), (soup.id, 1)])
+
+        self.place_order([(soup, 4)])
+        self.assertEqual(top_sellers('24h'), [(soup.id, 5), (stew.id, 2)])
+
+        # Ranks that no longer have an item are dropped
+        with self.captureOnCommitCallbacks(execute=True):
+            OrderItem.objects.filter(menu_item=soup).delete()
+        self.assertEqual(top_sellers('7d'), [(stew.id, 2)])
+        self.assertEqual(TopSeller.objects.count(), 3)
+
+    def test_fresh_ranking_is_read_in_one_query(self):
+        self.place_order([(self.dishes[0], 3)])
+        with self.assertNumQueries(1):
+            self.assertEqual(top_sellers('24h'), [(self.dishes[0].id, 3)])
+
+    def test_stale_ranking_drops_sales_that_left_the_window(self):
+        self.place_order([(self.dishes[0], 3)])
+        # As if the ranking was computed a day ago, from sales made then
+        earlier = timedelta(hours=25)
+        HourlyMenuItemSales.objects.update(hour=F('hour') - earlier)
+        TopSeller.objects.update(computed_at=F('computed_at') - earlier)
+
+        self.assertEqual(top_sellers('24h'), [])
+        self.assertEqual(top_sellers('7d'), [(self.dishes[0].id, 3)])
+
+    def test_command_re_ranks(self):
+        self.place_order([(self.dishes[0], 3)])
+        TopSeller.objects.all().delete()
+        call_command('refresh_top_sellers', stdout=StringIO())
+        self.assertEqual(top_sellers('30d'), [(self.dishes[0].id, 3)])
+
+    def test_menu_popular_follows_orders(self):
+        soup, stew = self.dishes
+        soup.popular = True
+        soup.save()
+        client = APIClient()
+        # Nothing sold yet: the hand-set popular flag
+        names = [item['name'] for item in client.get('/api/menu/popular/').json()]
+        self.assertEqual(names, ['Soup'])
+
+        self.place_order([(stew, 2)])
+        names = [item['name'] for item in client.get('/api/menu/popular/').json()]
+        self.assertEqual(names, ['Stew'])
+
+
+class SalesEndpointTests(RollupTestCase):
+
+    def test_sales_endpoints_are_staff_only(self):
+        self.place_order([(self.dishes[0], 1)])
+        client = APIClient()
+        client.force_authenticate(CustomUser.objects.create_user(username='ada', email='ada@example.com', password='pw'))
+        self.assertEqual(client.get('/api/analytics/sales/daily/').status_code, 403)
 
-# Create your tests here.
+        client.force_authenticate(CustomUser.objects.create_user(username='boss', email='boss@example.com', password='pw', is_staff=True))
+        for url in ('/api/analytics/sales/daily/', '/api/analytics/sales/menu-items/', '/api/analytics/sales/categories/'):
+            response = client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['results']), 1)
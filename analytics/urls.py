@@ -2,5 +2,7 @@ from django.urls import path
 from . import views
 
 urlpatterns = [
-    # Add your menu URLs here
-]
\ No newline at end of file
+    path('sales/daily/', views.DailySalesListView.as_view(), name='daily-sales'),
+    path('sales/menu-items/', views.DailyMenuItemSalesListView.as_view(), name='daily-menu-item-sales'),
+    path('sales/categories/', views.DailyCategorySalesListView.as_view(), name='daily-category-sales'),
+]
@@ -1,3 +1,29 @@
-from django.shortcuts import render
+from rest_framework import generics, permissions
+from .models import DailySales, DailyMenuItemSales, DailyCategorySales
+from .serializers import (
+    DailySalesSerializer, DailyMenuItemSalesSerializer, DailyCategorySalesSerializer
+)
 
-# Create your views here.
+# Reporting endpoints read the pre-aggregated rollups, never the order tables, and are staff only
+DATE_FILTERS = ['exact', 'gte', 'lte']
+
+class DailySalesListView(generics.ListAPIView):
+    queryset = DailySales.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = DailySalesSerializer
+    filterset_fields = {'date': DATE_FILTERS, 'order_type': ['exact'], 'status': ['exact']}
+    ordering_fields = ['date', 'orders_count', 'revenue']
+
+class DailyMenuItemSalesListView(generics.ListAPIView):
+    queryset = DailyMenuItemSales.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = DailyMenuItemSalesSerializer
+    filterset_fields = {'date': DATE_FILTERS, 'menu_item': ['exact']}
+    ordering_fields = ['date', 'quantity', 'revenue']
+
+class DailyCategorySalesListView(generics.ListAPIView):
+    queryset = DailyCategorySales.objects.all()
+    permission_classes = [permissions.IsAdminUser]
+    serializer_class = DailyCategorySalesSerializer
+    filterset_fields = {'date': DATE_FILTERS, 'category': ['exact']}
+    ordering_fields = ['date', 'quantity', 'revenue']
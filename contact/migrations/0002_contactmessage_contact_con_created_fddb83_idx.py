@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contact', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contactmessage',
+            index=models.Index(fields=['created_at'], name='contact_con_created_fddb83_idx'),
+        ),
+    ]
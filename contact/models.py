@@ -21,4 +21,7 @@ class ContactMessage(models.Model):
         return f"{self.name} - {self.subject}"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
\ No newline at end of file
@@ -52,6 +52,7 @@ class ContactMessageListView(generics.ListAPIView):
     queryset = ContactMessage.objects.all()
     serializer_class = ContactMessageSerializer
     permission_classes = [permissions.AllowAny]  # Changed to AllowAny
+    cursor_ordering = ['-created_at', '-id']
 
 class ContactMessageDetailView(generics.RetrieveUpdateDestroyAPIView):
     queryset = ContactMessage.objects.all()
@@ -0,0 +1,188 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset ("seek") pagination on a fixed ordering whose last field is unique,
+    e.g. ``['-created_at', '-id']``; ?ordering= does not apply.
+
+    The cursor carries the ordering values of the row a page continues from,
+    and the page is filtered on the whole tuple: for ``(a, b)`` descending,
+    ``a <= x AND (a < x OR b < y)``. The first condition is a range on the
+    leading index column, so a page costs one index range scan, with no OFFSET
+    and no COUNT however deep it is. Ordering fields must not be null.
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    invalid_cursor_message = 'Invalid cursor'
+
+    def __init__(self, ordering, page_size):
+        self.ordering = list(ordering)
+        self.page_size = page_size
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(page_size, self.max_page_size) if page_size > 0 else self.page_size
+
+    def fields(self, model):
+        return [(model._meta.get_field(name.lstrip('-')), name.startswith('-')) for name in self.ordering]
+
+    def encode_cursor(self, row, reverse):
+        # value_to_string keeps full precision (DjangoJSONEncoder cuts datetimes to milliseconds)
+        values = [field.value_to_string(row) for field, _ in self.fields(type(row))]
+        payload = json.dumps({'v': values, 'r': reverse})
+        cursor = urlsafe_b64encode(payload.encode()).decode()
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def decode_cursor(self, request, model):
+        """``(values, reverse)`` from ?cursor=, or None for the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            payload = json.loads(urlsafe_b64decode(encoded.encode()).decode())
+            fields = self.fields(model)
+            if len(payload['v']) != len(fields):
+                raise ValueError
+            values = [field.to_python(value) for (field, _), value in zip(fields, payload['v'])]
+            return values, bool(payload['r'])
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def seek(self, fields, values, reverse):
+        """Rows strictly after ``values`` in the ordering (before them when ``reverse``)"""
+        condition = None
+        for (field, descending), value in reversed(list(zip(fields, values))):
+            before = descending != reverse
+            past = Q(**{f'{field.name}__{"lt" if before else "gt"}': value})
+            if condition is None:
+                condition = past
+            else:
+                # Leading column as a range first, so the index bounds the scan
+                condition = Q(**{f'{field.name}__{"lte" if before else "gte"}': value}) & (past | condition)
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        cursor = self.decode_cursor(request, queryset.model)
+        reverse = bool(cursor and cursor[1])
+
+        if reverse:
+            # Walk backwards from the cursor, then put the page back in order
+            queryset = queryset.order_by(*(
+                name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering
+            ))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if cursor:
+            queryset = queryset.filter(self.seek(self.fields(queryset.model), cursor[0], reverse))
+
+        # One row past the page tells whether there is another page that way
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+            self.has_next, self.has_previous = bool(rows), has_more
+        else:
+            self.has_next, self.has_previous = has_more, cursor is not None and bool(rows)
+        self.page = rows
+        return rows
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.encode_cursor(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class ListPagination(PageNumberPagination):
+    """
+    Page numbers by default, as before. Two opt-ins keep deep pages cheap:
+
+    * ``?cursor=`` (empty to start at the top) switches to keyset pagination on
+      the view's ``cursor_ordering`` (ending in a unique field), so any page is
+      a range scan from the cursor, no OFFSET or COUNT. Views without
+      ``cursor_ordering`` stay on page numbers.
+    * ``?count=false`` keeps page numbers but drops ``count`` and its COUNT(*).
+    """
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+
+    keyset = None
+    uncounted = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = getattr(view, 'cursor_ordering', None)
+        if ordering and self.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(ordering, self.page_size)
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        if request.query_params.get(self.count_query_param, '').lower() in ('false', '0'):
+            return self.paginate_without_count(queryset, request)
+
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        page_number = request.query_params.get(self.page_query_param) or 1
+        try:
+            page_number = int(page_number)
+            if page_number < 1:
+                raise ValueError
+        except ValueError:
+            raise NotFound(self.invalid_page_message.format(page_number=page_number, message='Invalid page.'))
+
+        # One row past the page tells whether there is a next page
+        offset = (page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.uncounted = True
+        self.request = request
+        self.page_number = page_number
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        if self.uncounted:
+            return Response({
+                'next': self.get_uncounted_link(self.page_number + 1) if self.has_next else None,
+                'previous': self.get_uncounted_link(self.page_number - 1) if self.page_number > 1 else None,
+                'results': data,
+            })
+        return super().get_paginated_response(data)
+
+    def get_uncounted_link(self, page_number):
+        url = self.request.build_absolute_uri()
+        if page_number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page_number)
@@ -0,0 +1,252 @@
+import operator
+from functools import reduce
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+from rest_framework.filters import SearchFilter
+
+# The trigram tokenizer indexes three-character runs, so shorter terms can't use it
+MIN_TERM_LENGTH = 3
+
+
+class FullTextIndex:
+    """
+    An SQLite FTS5 table mirroring some text columns of one model's table,
+    kept in sync by triggers.
+
+    ``columns`` maps each indexed column to the lookup holding the same text,
+    so a backend without the table can search those fields with icontains.
+    ``expressions`` fills computed columns from SQL (``{id}`` is the row's
+    primary key); they are recomputed whenever rows of a ``refresh_on``
+    table ``(table, foreign_key, watched_columns)`` change. Tables whose
+    primary key is not an integer get a ``<name>_keys`` table handing out
+    stable integer rowids.
+    """
+
+    def __init__(self, name, model, table, columns, expressions=None, refresh_on=(), integer_pk=True):
+        self.name = name
+        self.model = model
+        self.table = table
+        self.columns = columns
+        self.expressions = expressions or {}
+        self.refresh_on = refresh_on
+        self.integer_pk = integer_pk
+
+    @property
+    def keys_table(self):
+        return f'{self.name}_keys'
+
+    def rowid(self, pk):
+        if self.integer_pk:
+            return pk
+        return f'(SELECT id FROM {self.keys_table} WHERE object_id = {pk})'
+
+    def values(self, row):
+        return ', '.join(
+            self.expressions[column].format(id=f'{row}.id') if column in self.expressions else f'{row}.{column}'
+            for column in self.columns
+        )
+
+    def trigger_names(self):
+        names = [f'{self.name}_insert', f'{self.name}_update', f'{self.name}_delete']
+        for table, _, _ in self.refresh_on:
+            names += [f'{self.name}_{table}_{event}' for event in ('insert', 'update', 'delete')]
+        return names
+
+    def trigger_sql(self):
+        column_list = ', '.join(self.columns)
+        plain = [column for column in self.columns if column not in self.expressions]
+        key_insert = key_delete = ''
+        if not self.integer_pk:
+            key_insert = f'INSERT INTO {self.keys_table}(object_id) VALUES (NEW.id);'
+            key_delete = f'DELETE FROM {self.keys_table} WHERE object_id = OLD.id;'
+
+        assignments = ', '.join(f'{column} = NEW.{column}' for column in plain)
+        statements = [
+            f'CREATE TRIGGER {self.name}_insert AFTER INSERT ON {self.table} BEGIN '
+            f'{key_insert} INSERT INTO {self.name}(rowid, {column_list}) VALUES ({self.rowid("NEW.id")}, {self.values("NEW")}); END',
+            f'CREATE TRIGGER {self.name}_update AFTER UPDATE OF {", ".join(plain)} ON {self.table} BEGIN '
+            f'UPDATE {self.name} SET {assignments} WHERE rowid = {self.rowid("NEW.id")}; END',
+            f'CREATE TRIGGER {self.name}_delete AFTER DELETE ON {self.table} BEGIN '
+            f'DELETE FROM {self.name} WHERE rowid = {self.rowid("OLD.id")}; {key_delete} END',
+        ]
+
+        for table, foreign_key, watched in self.refresh_on:
+            def refresh(row):
+                assignments = ', '.join(
+                    f'{column} = {expression.format(id=f"{row}.{foreign_key}")}'
+                    for column, expression in self.expressions.items()
+                )
+                return f'UPDATE {self.name} SET {assignments} WHERE rowid = {self.rowid(f"{row}.{foreign_key}")};'
+
+            statements += [
+                f'CREATE TRIGGER {self.name}_{table}_insert AFTER INSERT ON {table} BEGIN {refresh("NEW")} END',
+                f'CREATE TRIGGER {self.name}_{table}_update AFTER UPDATE OF {", ".join([foreign_key, *watched])} '
+                f'ON {table} BEGIN {refresh("OLD")} {refresh("NEW")} END',
+                f'CREATE TRIGGER {self.name}_{table}_delete AFTER DELETE ON {table} BEGIN {refresh("OLD")} END',
+            ]
+        return statements
+
+    def backfill_sql(self):
+        column_list = ', '.join(self.columns)
+        if self.integer_pk:
+            return [f'INSERT INTO {self.name}(rowid, {column_list}) SELECT t.id, {self.values("t")} FROM {self.table} t']
+        return [
+            f'INSERT INTO {self.keys_table}(object_id) SELECT id FROM {self.table}',
+            f'INSERT INTO {self.name}(rowid, {column_list}) SELECT k.id, {self.values("t")} '
+            f'FROM {self.table} t JOIN {self.keys_table} k ON k.object_id = t.id',
+        ]
+
+    def create_sql(self):
+        column_list = ', '.join(self.columns)
+        statements = [f"CREATE VIRTUAL TABLE {self.name} USING fts5({column_list}, tokenize='trigram')"]
+        if not self.integer_pk:
+            statements.append(f'CREATE TABLE {self.keys_table} (id INTEGER PRIMARY KEY, object_id TEXT NOT NULL UNIQUE)')
+        return statements + self.trigger_sql() + self.backfill_sql()
+
+    def rebuild_sql(self):
+        """Refill the table from scratch and put every trigger back"""
+        statements = self.drop_trigger_sql() + [f'DELETE FROM {self.name}']
+        if not self.integer_pk:
+            statements.append(f'DELETE FROM {self.keys_table}')
+        return statements + self.trigger_sql() + self.backfill_sql()
+
+    def drop_trigger_sql(self):
+        return [f'DROP TRIGGER IF EXISTS {name}' for name in self.trigger_names()]
+
+    def drop_sql(self):
+        statements = self.drop_trigger_sql()
+        statements.append(f'DROP TABLE IF EXISTS {self.name}')
+        if not self.integer_pk:
+            statements.append(f'DROP TABLE IF EXISTS {self.keys_table}')
+        return statements
+
+    def create(self, apps, schema_editor):
+        """RunPython forwards: build and fill the table (SQLite only)"""
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in self.create_sql():
+                schema_editor.execute(statement)
+
+    def drop(self, apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in self.drop_sql():
+                schema_editor.execute(statement)
+
+    def restore_triggers(self, apps, schema_editor):
+        """
+        RunPython for migrations that make Django rebuild the source table on
+        SQLite (unique fields, most AlterFields): the copy has no triggers.
+        The index rows themselves are keyed by primary key and stay valid.
+        """
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in self.drop_trigger_sql() + self.trigger_sql():
+                schema_editor.execute(statement)
+
+    def missing_triggers(self, connection):
+        """Names of this index's triggers absent from the database (None when it has no table)"""
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+            existing = {(kind, name) for kind, name in cursor.fetchall()}
+        if ('table', self.name) not in existing:
+            return None
+        return [name for name in self.trigger_names() if ('trigger', name) not in existing]
+
+    def repair(self, sender=None, using='default', **kwargs):
+        """
+        post_migrate receiver: when a migration rebuilt a source table without
+        a ``restore_triggers`` step, SQLite silently dropped the triggers and
+        the index stopped following writes. Put them back and refill the
+        table, since rows written in between are missing or stale.
+        """
+        connection = connections[using]
+        if connection.vendor != 'sqlite' or not self.missing_triggers(connection):
+            return
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            for statement in self.rebuild_sql():
+                cursor.execute(statement)
+
+    def match_expression(self, term, columns=None):
+        """An FTS5 query for ``term`` as one phrase, i.e. a substring with trigrams"""
+        phrase = '"%s"' % term.replace('"', '""')
+        if columns:
+            return '{%s} : %s' % (' '.join(columns), phrase)
+        return phrase
+
+    def matching_sql(self):
+        """SQL selecting the primary keys of the rows matching a MATCH parameter"""
+        rowids = f'SELECT rowid FROM {self.name} WHERE {self.name} MATCH %s'
+        if self.integer_pk:
+            return rowids
+        return f'SELECT object_id FROM {self.keys_table} WHERE id IN ({rowids})'
+
+
+class ContainsSearchBackend:
+    """icontains over the indexed fields - the old behaviour, a scan per term"""
+
+    def matching(self, index, term, columns=None, using='default'):
+        fields = [index.columns[column] for column in columns or index.columns]
+        model = apps.get_model(index.model)
+        condition = reduce(operator.or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+        return model._default_manager.using(using).filter(condition).values('pk')
+
+
+class SQLiteFullTextSearchBackend(ContainsSearchBackend):
+    """Answers from the FTS5 trigram tables, falling back to icontains off SQLite or for short terms"""
+
+    def matching(self, index, term, columns=None, using='default'):
+        if connections[using].vendor != 'sqlite' or len(term) < MIN_TERM_LENGTH:
+            return super().matching(index, term, columns, using)
+        return RawSQL(index.matching_sql(), [index.match_expression(term, columns)])
+
+
+def get_search_backend():
+    return import_string(settings.SEARCH_BACKEND)()
+
+
+def search_queryset(queryset, indexes, terms):
+    """
+    Keep the rows of ``queryset`` matching every term in at least one of
+    ``indexes``. It maps a lookup (``'pk'`` for the queryset's own index, a
+    foreign key for a related one) to a FullTextIndex, or to an
+    ``(index, columns)`` pair to search only some of its columns.
+    """
+    backend = get_search_backend()
+    targets = [
+        (lookup, *(index if isinstance(index, tuple) else (index, None)))
+        for lookup, index in indexes.items()
+    ]
+    for term in terms:
+        queryset = queryset.filter(reduce(operator.or_, (
+            Q(**{f'{lookup}__in': backend.matching(index, term, columns, queryset.db)})
+            for lookup, index, columns in targets
+        )))
+    return queryset
+
+
+def full_text_filter(index, column, lookup='pk'):
+    """A django-filter ``method`` matching the value against one column of ``index``"""
+    def filter_method(queryset, name, value):
+        if not value:
+            return queryset
+        return search_queryset(queryset, {lookup: (index, [column])}, [value])
+    return filter_method
+
+
+class FullTextSearchFilter(SearchFilter):
+    """
+    ``?search=`` answered from the view's ``search_indexes`` when it declares
+    them; other views keep SearchFilter's icontains over ``search_fields``.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        indexes = getattr(view, 'search_indexes', None)
+        if not indexes:
+            return super().filter_queryset(request, queryset, view)
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_queryset(queryset, indexes, terms)
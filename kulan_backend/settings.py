@@ -73,6 +73,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Seconds a writer waits for SQLite's lock (bookings queue on it, see
+            # reservations.models.booking_transaction)
+            'timeout': 20,
+        },
+        'TEST': {
+            # On disk rather than in memory, so threaded tests share one database
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
@@ -99,6 +108,66 @@ USE_TZ = True
 USE_I18N = True
 USE_TZ = True
 
+# Cache
+# Menu version bumps, cached carts and the cache event broker only reach other server processes
+# through a cache they all share: with more than one worker set CACHE_BACKEND to Redis/Memcached
+# (e.g. django.core.cache.backends.redis.RedisCache, CACHE_LOCATION=redis://127.0.0.1:6379/1).
+# The local-memory default is per-process and only suits a single worker or development.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='kulan-default'),
+        # Anonymous carts live here too, so keep room for more than the default 300 keys
+        'OPTIONS': {'MAX_ENTRIES': config('CACHE_MAX_ENTRIES', default=10000, cast=int)},
+    }
+}
+
+# Menu payloads are invalidated by version bumps, the timeout only bounds memory use
+MENU_CACHE_TIMEOUT = config('MENU_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Anonymous carts: 'db' stores every cart, 'cache' keeps them in the cache until checkout or
+# login - only with a cache all server processes share (Redis/Memcached), not the LocMemCache above
+CART_BACKEND = config('CART_BACKEND', default='db')
+CART_CACHE_TIMEOUT = config('CART_CACHE_TIMEOUT', default=60 * 60 * 24 * 2, cast=int)
+
+# Expired sessions/checkouts and abandoned carts are deleted by `manage.py reap_expired_carts`;
+# a non-zero interval (seconds) also runs it in a background thread of each server process
+CART_REAPER_INTERVAL = config('CART_REAPER_INTERVAL', default=0, cast=int)
+CART_REAPER_BATCH_SIZE = config('CART_REAPER_BATCH_SIZE', default=500, cast=int)
+# Deleted-order tombstones are kept this many days (pruned as orders are deleted, or by
+# `manage.py prune_order_tombstones`); changes-feed clients whose cursor is older must resync
+ORDER_TOMBSTONE_RETENTION_DAYS = config('ORDER_TOMBSTONE_RETENTION_DAYS', default=30, cast=int)
+
+# Seats available in each reservation time slot
+RESERVATION_CAPACITY = config('RESERVATION_CAPACITY', default=50, cast=int)
+
+# Bookable times offered by the reservation picker's day grid
+RESERVATION_OPENING_TIME = config('RESERVATION_OPENING_TIME', default='10:00')
+RESERVATION_CLOSING_TIME = config('RESERVATION_CLOSING_TIME', default='22:00')
+RESERVATION_SLOT_MINUTES = config('RESERVATION_SLOT_MINUTES', default=15, cast=int)
+# Day grids are dropped on every booking change, the timeout only bounds memory use
+RESERVATION_AVAILABILITY_CACHE_TIMEOUT = config('RESERVATION_AVAILABILITY_CACHE_TIMEOUT', default=60 * 60, cast=int)
+
+# Public reservation stats are shared by every poller for a few seconds
+RESERVATION_STATS_CACHE_TIMEOUT = config('RESERVATION_STATS_CACHE_TIMEOUT', default=10, cast=int)
+
+# Real-time order feed (/api/orders/events/). Use 'orders.events.CacheBroker' with a shared
+# cache (Redis/Memcached) when several worker processes serve the stream
+ORDER_EVENTS_BROKER = config('ORDER_EVENTS_BROKER', default='orders.events.InProcessBroker')
+ORDER_EVENTS_BUFFER = config('ORDER_EVENTS_BUFFER', default=500, cast=int)
+ORDER_EVENTS_CACHE_TIMEOUT = config('ORDER_EVENTS_CACHE_TIMEOUT', default=60 * 60, cast=int)
+ORDER_EVENTS_POLL_INTERVAL = config('ORDER_EVENTS_POLL_INTERVAL', default=1, cast=float)
+ORDER_EVENTS_HEARTBEAT = config('ORDER_EVENTS_HEARTBEAT', default=15, cast=int)
+ORDER_EVENTS_STREAM_SECONDS = config('ORDER_EVENTS_STREAM_SECONDS', default=5 * 60, cast=int)
+ORDER_EVENTS_RETRY_MS = config('ORDER_EVENTS_RETRY_MS', default=2000, cast=int)
+
+# Order dashboard stats are bucketed per minute
+ORDER_STATS_CACHE_TIMEOUT = config('ORDER_STATS_CACHE_TIMEOUT', default=60, cast=int)
+
+# ?search= on orders, order items, reservations and menu items reads SQLite FTS5 trigram tables
+# kept in sync by triggers; 'kulan_backend.search.ContainsSearchBackend' goes back to icontains
+SEARCH_BACKEND = config('SEARCH_BACKEND', default='kulan_backend.search.SQLiteFullTextSearchBackend')
+
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
@@ -116,11 +185,11 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'kulan_backend.pagination.ListPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_FILTER_BACKENDS': [
         'django_filters.rest_framework.DjangoFilterBackend',
-        'rest_framework.filters.SearchFilter',
+        'kulan_backend.search.FullTextSearchFilter',
         'rest_framework.filters.OrderingFilter',
     ],
 }
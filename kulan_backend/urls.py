@@ -41,6 +41,7 @@ urlpatterns = [
    path('api/orderprocess/', include('orderprocess.urls')),  # ADD THIS LINE
    path('api/reservations/', include('reservations.urls')),
    path('api/contact/', include('contact.urls')),
+   path('api/analytics/', include('analytics.urls')),
 
     
 ]
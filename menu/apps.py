@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu'
+
+    def ready(self):
+        from . import checks, signals  # noqa: F401
+        from .search import MENU_ITEM_INDEX
+        # Rebuilding a table on SQLite drops the full-text triggers; put them back after migrating
+        post_migrate.connect(MENU_ITEM_INDEX.repair, sender=self, weak=False, dispatch_uid='menu.menu_item_index')
@@ -0,0 +1,56 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+MENU_VERSION_KEY = 'menu:version'
+
+
+def get_menu_version():
+    """Return the current global menu version, seeding it if the cache lost it"""
+    version = cache.get(MENU_VERSION_KEY)
+    if version is None:
+        # Seed from the clock so a version lost to eviction never reuses an old number
+        cache.add(MENU_VERSION_KEY, time.time_ns(), None)
+        version = cache.get(MENU_VERSION_KEY)
+    return version
+
+
+def bump_menu_version():
+    """Invalidate every cached menu payload by moving to a new version"""
+    try:
+        return cache.incr(MENU_VERSION_KEY)
+    except ValueError:
+        # Key was evicted - reseeding from the clock is already a new version
+        return get_menu_version()
+
+
+def menu_cache_key(request, name):
+    """Build a cache key for a menu payload, scoped to the version, host and query string"""
+    raw = f"{request.scheme}://{request.get_host()}{request.get_full_path()}"
+    digest = hashlib.md5(raw.encode('utf-8')).hexdigest()
+    return f"menu:v{get_menu_version()}:{name}:{digest}"
+
+
+def cached_menu_response(request, name, build_data):
+    """
+    Serve menu data from the versioned cache as pre-rendered JSON bytes.
+
+    ``build_data`` is only called on a miss. Non-JSON renderers (e.g. the
+    browsable API) bypass the cache and get a regular Response.
+    """
+    renderer = getattr(request, 'accepted_renderer', None)
+    if not isinstance(renderer, JSONRenderer):
+        return Response(build_data())
+
+    key = menu_cache_key(request, name)
+    content = cache.get(key)
+    if content is None:
+        content = renderer.render(build_data(), request.accepted_media_type, {'request': request})
+        cache.set(key, content, settings.MENU_CACHE_TIMEOUT)
+
+    return HttpResponse(content, content_type=renderer.media_type)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register(checks.Tags.caches, deploy=True)
+def check_menu_cache_shared(app_configs, **kwargs):
+    """
+    Menu edits invalidate cached payloads by bumping ``menu:version`` in the
+    default cache. A per-process local-memory cache only sees the bumps made
+    by its own process, so other workers keep serving the old menu until
+    MENU_CACHE_TIMEOUT.
+    """
+    backend = settings.CACHES['default']['BACKEND']
+    if backend.endswith('.LocMemCache'):
+        return [checks.Warning(
+            f"The default cache is {backend}, which is per-process: menu changes only "
+            "invalidate the cached menu in the worker that made them.",
+            hint="Set CACHE_BACKEND/CACHE_LOCATION to a Redis or Memcached cache all workers share.",
+            id='menu.W001',
+        )]
+    return []
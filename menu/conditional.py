@@ -0,0 +1,62 @@
+import calendar
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, quote_etag
+from django.utils.http import http_date
+
+from .models import MenuCategory, MenuItem
+
+
+def menu_validators(request, items, categories):
+    """
+    Compute a strong ETag and Last-Modified timestamp for a menu payload.
+
+    Both come from the ``updated_at`` stamps of the items and categories that
+    make up the response, so they can be checked without serializing anything.
+    Counts are mixed into the ETag so deletions change it too.
+    """
+    item_stamp = items.order_by().aggregate(count=Count('pk'), changed=Max('updated_at'))
+    category_stamp = categories.order_by().aggregate(count=Count('pk'), changed=Max('updated_at'))
+
+    raw = '|'.join([
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', ''),
+        str(item_stamp['count']),
+        item_stamp['changed'].isoformat() if item_stamp['changed'] else '',
+        str(category_stamp['count']),
+        category_stamp['changed'].isoformat() if category_stamp['changed'] else '',
+    ])
+    etag = quote_etag(hashlib.md5(raw.encode('utf-8')).hexdigest())
+
+    changed = [stamp for stamp in (item_stamp['changed'], category_stamp['changed']) if stamp]
+    last_modified = calendar.timegm(max(changed).utctimetuple()) if changed else None
+    return etag, last_modified
+
+
+def conditional_menu_response(request, items, categories, respond):
+    """
+    Answer with 304 Not Modified when the client's validators still match,
+    otherwise call ``respond()`` and attach the validators to its response.
+    """
+    etag, last_modified = menu_validators(request, items, categories)
+
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if response is None:
+        response = respond()
+
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    return response
+
+
+def items_for_categories(categories):
+    """Items belonging to the given categories queryset"""
+    return MenuItem.objects.filter(category__in=categories.order_by().values('pk'))
+
+
+def categories_for_items(items):
+    """Categories referenced by the given items queryset"""
+    return MenuCategory.objects.filter(pk__in=items.order_by().values('category'))
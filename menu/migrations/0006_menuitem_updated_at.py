@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0005_menucategory_created_at_menucategory_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+from django.db import migrations
+
+from kulan_backend.search import FullTextIndex
+
+# Frozen copy of menu.search.MENU_ITEM_INDEX
+MENU_ITEM_INDEX = FullTextIndex(
+    'menu_menuitem_search', 'menu.MenuItem', 'menu_menuitem',
+    columns={'name': 'name', 'description': 'description'},
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_menuitem_updated_at'),
+    ]
+
+    operations = [
+        migrations.RunPython(MENU_ITEM_INDEX.create, MENU_ITEM_INDEX.drop),
+    ]
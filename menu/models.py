@@ -59,6 +59,9 @@ class MenuItem(models.Model):
     category = models.ForeignKey(MenuCategory, on_delete=models.CASCADE, related_name='items')
     extra_toppings = models.ManyToManyField(ExtraTopping, blank=True)
 
+    # Change stamp for conditional GETs - also touched when linked toppings change
+    updated_at = models.DateTimeField(auto_now=True)
+
     def __str__(self):
         return self.name
 
@@ -0,0 +1,6 @@
+from kulan_backend.search import FullTextIndex
+
+MENU_ITEM_INDEX = FullTextIndex(
+    'menu_menuitem_search', 'menu.MenuItem', 'menu_menuitem',
+    columns={'name': 'name', 'description': 'description'},
+)
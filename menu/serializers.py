@@ -6,7 +6,56 @@ class ExtraToppingSerializer(serializers.ModelSerializer):
         model = ExtraTopping
         fields = ['name', 'price']
 
+# Fields drawn on a name/price/image card - used by ?view=compact
+COMPACT_MENU_FIELDS = ['id', 'name', 'price', 'image', 'popular', 'category', 'category_name', 'spice_level']
+
+
+def requested_menu_fields(request, allow_fields=True):
+    """
+    Return the MenuItem fields asked for with ``?view=compact`` or ``?fields=a,b``,
+    or None when the full representation is wanted.
+    """
+    if request is None:
+        return None
+    params = request.query_params
+    if params.get('view') == 'compact':
+        return list(COMPACT_MENU_FIELDS)
+    if allow_fields and params.get('fields'):
+        return [name.strip() for name in params['fields'].split(',') if name.strip()]
+    return None
+
+
+def menu_item_only_fields(fields):
+    """Translate MenuItemSerializer field names into the MenuItem columns they read"""
+    columns = {'id'}
+    concrete = {field.name for field in MenuItem._meta.concrete_fields}
+    for name in fields:
+        if name == 'category_name':
+            columns.update(['category', 'category__name'])
+        elif name == 'spice_level_display':
+            columns.add('spice_level')
+        elif name in concrete:
+            columns.add(name)
+    return columns
+
+
+def sparse_menu_queryset(queryset, fields):
+    """Restrict a MenuItem queryset to the columns and relations ``fields`` needs"""
+    if not fields:
+        return queryset
+    columns = menu_item_only_fields(fields)
+    if 'category__name' not in columns:
+        queryset = queryset.select_related(None)
+    if 'extra_toppings' not in fields:
+        queryset = queryset.prefetch_related(None)
+    return queryset.only(*columns)
+
+
 class MenuItemSerializer(serializers.ModelSerializer):
+    """
+    Full menu item representation. A ``menu_fields`` list in the serializer
+    context limits the output to those fields (sparse fieldsets).
+    """
     category_name = serializers.CharField(source='category.name', read_only=True)
     extra_toppings = ExtraToppingSerializer(many=True, read_only=True)
     spice_level_display = serializers.CharField(source='get_spice_level_display', read_only=True)
@@ -21,6 +70,13 @@ class MenuItemSerializer(serializers.ModelSerializer):
             'spice_level', 'spice_level_display', 'customizable_spice'
         ]
 
+    def get_fields(self):
+        fields = super().get_fields()
+        wanted = self.context.get('menu_fields')
+        if wanted:
+            fields = {name: field for name, field in fields.items() if name in wanted}
+        return fields
+
 class MenuCategorySerializer(serializers.ModelSerializer):
     items = MenuItemSerializer(many=True, read_only=True)
     item_count = serializers.SerializerMethodField()  # Change to SerializerMethodField
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_delete, m2m_changed
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .cache import bump_menu_version
+from .models import MenuCategory, MenuItem, ExtraTopping
+
+
+def _invalidate_menu_cache():
+    # Wait for the commit so readers never cache the old rows under the new version
+    transaction.on_commit(bump_menu_version)
+
+
+@receiver(post_save, sender=MenuCategory)
+@receiver(post_save, sender=MenuItem)
+@receiver(post_save, sender=ExtraTopping)
+@receiver(post_delete, sender=MenuCategory)
+@receiver(post_delete, sender=MenuItem)
+@receiver(post_delete, sender=ExtraTopping)
+def menu_changed(sender, **kwargs):
+    _invalidate_menu_cache()
+
+
+def _touch_items(items):
+    # Nested toppings are part of each item's payload, so move the item change stamp too.
+    # update() skips post_save, which keeps this from re-triggering the receivers above.
+    items.update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=ExtraTopping)
+@receiver(pre_delete, sender=ExtraTopping)
+def topping_changed(sender, instance, **kwargs):
+    _touch_items(MenuItem.objects.filter(extra_toppings=instance))
+
+
+@receiver(m2m_changed, sender=MenuItem.extra_toppings.through)
+def menu_toppings_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if reverse and action == 'pre_clear':
+        # pk_set is not provided for clear(), so capture the items before the links go
+        _touch_items(MenuItem.objects.filter(extra_toppings=instance))
+    elif action in ('post_add', 'post_remove', 'post_clear'):
+        if reverse:
+            if pk_set:
+                _touch_items(MenuItem.objects.filter(pk__in=pk_set))
+        else:
+            _touch_items(MenuItem.objects.filter(pk=instance.pk))
+        _invalidate_menu_cache()
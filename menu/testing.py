@@ -0,0 +1,21 @@
+from .models import MenuCategory, MenuItem
+
+
+def make_menu_item(name, category=None, **kwargs):
+    """Create a menu item with every required field filled in, in the 'lunch' category by default"""
+    defaults = {
+        'description': 'Test dish',
+        'detailed_description': 'A longer description of the test dish',
+        'price': '9.99',
+        'prep_time': '15 min',
+        'serves': '1',
+        'calories': '400',
+        'protein': '20g',
+        'carbs': '40g',
+        'fat': '10g',
+        'rating': '4.5',
+    }
+    defaults.update(kwargs)
+    if category is None:
+        category = MenuCategory.objects.get(id='lunch')
+    return MenuItem.objects.create(name=name, category=category, **defaults)
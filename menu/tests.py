@@ -1,3 +1,174 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from .models import MenuCategory, MenuItem, ExtraTopping
+from .cache import get_menu_version
+from .checks import check_menu_cache_shared
+from .serializers import COMPACT_MENU_FIELDS
+from .testing import make_menu_item
+
+
+class MenuCategoryQueryCountTests(TestCase):
+    """The category endpoints must not issue queries per category, item or topping"""
+
+    # Conditional GET stamps (2) + pagination count + categories + items + toppings
+    LIST_QUERIES = 6
+    # Conditional GET stamps (2) + category + items + toppings
+    DETAIL_QUERIES = 5
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.toppings = [
+            ExtraTopping.objects.create(name=f'Topping {i}', price='1.00') for i in range(3)
+        ]
+
+    def add_items(self, count):
+        for category in MenuCategory.objects.all():
+            for i in range(count):
+                item = make_menu_item(f'{category.id} dish {i}', category)
+                item.extra_toppings.set(self.toppings)
+
+    def test_category_list_query_count(self):
+        self.add_items(1)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/menu/categories/')
+        self.assertEqual(response.status_code, 200)
+
+        cache.clear()
+        self.add_items(5)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/menu/categories/')
+        self.assertEqual(response.status_code, 200)
+
+        lunch = next(c for c in response.json()['results'] if c['id'] == 'lunch')
+        self.assertEqual(lunch['item_count'], 6)
+        self.assertEqual(len(lunch['items']), 6)
+        self.assertEqual(lunch['items'][0]['category_name'], 'Lunch')
+        self.assertEqual(len(lunch['items'][0]['extra_toppings']), 3)
+
+    def test_category_detail_query_count(self):
+        self.add_items(5)
+        with self.assertNumQueries(self.DETAIL_QUERIES):
+            response = self.client.get('/api/menu/categories/lunch/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['items']), 5)
+
+
+class MenuCacheTests(TestCase):
+    """Menu payloads are cached per version; any menu write moves to a new version"""
+
+    # Conditional GET stamps only - the payload itself comes from the cache
+    CACHED_LIST_QUERIES = 2
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.item = make_menu_item('Lamb Stew')
+
+    def item_names(self):
+        response = self.client.get('/api/menu/items/')
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.json()['results']]
+
+    def test_second_read_is_served_from_cache(self):
+        self.assertEqual(self.item_names(), ['Lamb Stew'])
+        with self.assertNumQueries(self.CACHED_LIST_QUERIES):
+            self.assertEqual(self.item_names(), ['Lamb Stew'])
+
+    def test_item_edit_bumps_the_version(self):
+        self.item_names()
+        version = get_menu_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.name = 'Beef Stew'
+            self.item.save()
+        self.assertGreater(get_menu_version(), version)
+        self.assertEqual(self.item_names(), ['Beef Stew'])
+
+    def test_category_edit_refreshes_nested_payloads(self):
+        response = self.client.get('/api/menu/items/')
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Lunch')
+        with self.captureOnCommitCallbacks(execute=True):
+            category = MenuCategory.objects.get(id='lunch')
+            category.name = 'Midday'
+            category.save()
+        response = self.client.get('/api/menu/items/')
+        self.assertEqual(response.json()['results'][0]['category_name'], 'Midday')
+
+    def test_deploy_check_wants_a_shared_cache(self):
+        self.assertEqual([warning.id for warning in check_menu_cache_shared(None)], ['menu.W001'])
+        with override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}
+        }):
+            self.assertEqual(check_menu_cache_shared(None), [])
+
+
+class ConditionalMenuTests(TestCase):
+    """Menu reads carry validators and answer 304 until the rows behind them change"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.item = make_menu_item('Lamb Stew')
+
+    def test_validators_and_not_modified(self):
+        for url in ('/api/menu/items/', f'/api/menu/items/{self.item.pk}/', '/api/menu/categories/lunch/'):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('ETag', response)
+            self.assertIn('Last-Modified', response)
+
+            again = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(again.status_code, 304)
+            self.assertEqual(again['ETag'], response['ETag'])
+            again = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+            self.assertEqual(again.status_code, 304)
+
+    def test_item_edit_changes_the_etag(self):
+        url = f'/api/menu/items/{self.item.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.item.price = '12.50'
+            self.item.save()
+
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()['price'], '12.50')
+
+    def test_unknown_item_is_not_found(self):
+        self.assertEqual(self.client.get('/api/menu/items/nope/').status_code, 404)
+
+
+class SparseMenuFieldsTests(TestCase):
+    """?fields= and ?view=compact trim both the payload and the columns loaded"""
+
+    # Conditional GET stamps (2) + pagination count + items, without the toppings prefetch
+    COMPACT_LIST_QUERIES = 4
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.item = make_menu_item('Lamb Stew')
+        self.item.extra_toppings.add(ExtraTopping.objects.create(name='Cheese', price='1.00'))
+
+    def test_fields_limits_the_payload(self):
+        response = self.client.get('/api/menu/items/', {'fields': 'id, name,price'})
+        self.assertEqual(response.json()['results'], [{'id': self.item.pk, 'name': 'Lamb Stew', 'price': '9.99'}])
+
+        response = self.client.get(f'/api/menu/items/{self.item.pk}/', {'fields': 'name,extra_toppings'})
+        self.assertEqual(response.json(), {'name': 'Lamb Stew', 'extra_toppings': [{'name': 'Cheese', 'price': '1.00'}]})
+
+    def test_compact_view(self):
+        with self.assertNumQueries(self.COMPACT_LIST_QUERIES):
+            response = self.client.get('/api/menu/items/', {'view': 'compact'})
+        item = response.json()['results'][0]
+        self.assertEqual(sorted(item), sorted(COMPACT_MENU_FIELDS))
+        self.assertEqual(item['category_name'], 'Lunch')
+
+    def test_full_representation_by_default(self):
+        item = self.client.get(f'/api/menu/items/{self.item.pk}/').json()
+        self.assertIn('detailed_description', item)
+        self.assertEqual(len(item['extra_toppings']), 1)
@@ -1,28 +1,116 @@
 from rest_framework import viewsets, permissions
 from rest_framework.decorators import api_view, action
 from rest_framework.response import Response
-from django.db.models import Count
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.models import Count, Prefetch
 from .models import MenuCategory, MenuItem, ExtraTopping
-from .serializers import MenuCategorySerializer, MenuItemSerializer, ExtraToppingSerializer
+from .serializers import (
+    MenuCategorySerializer, MenuItemSerializer, ExtraToppingSerializer,
+    requested_menu_fields, sparse_menu_queryset
+)
+from .cache import cached_menu_response
+from .conditional import conditional_menu_response, items_for_categories, categories_for_items
+from .search import MENU_ITEM_INDEX
+from analytics.rollups import TOP_SELLER_WINDOWS, top_sellers
+
+class ConditionalMenuMixin:
+    """
+    Answer list/retrieve with 304 Not Modified when the menu rows behind them are unchanged.
+
+    ``validated_rows`` says what the view's own rows are ('items' or
+    'categories'); the other side is derived from them, since both kinds
+    of row end up in the payload.
+    """
+    validated_rows = None
+
+    def get_validator_querysets(self):
+        """Return the (items, categories) querysets the response is built from"""
+        if self.action == 'retrieve':
+            lookup = self.kwargs[self.lookup_url_kwarg or self.lookup_field]
+            model = self.get_queryset().model
+            try:
+                rows = model.objects.filter(pk=lookup)
+            except (ValueError, ValidationError):
+                rows = model.objects.none()
+        else:
+            rows = self.filter_queryset(self.get_queryset())
+
+        if self.validated_rows == 'items':
+            return rows, categories_for_items(rows)
+        if self.validated_rows == 'categories':
+            return items_for_categories(rows), rows
+        raise ImproperlyConfigured(f"{type(self).__name__}.validated_rows must be 'items' or 'categories'")
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        items, categories = self.get_validator_querysets()
+        return conditional_menu_response(
+            request, items, categories,
+            lambda: parent.list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        parent = super()
+        items, categories = self.get_validator_querysets()
+        return conditional_menu_response(
+            request, items, categories,
+            lambda: parent.retrieve(request, *args, **kwargs)
+        )
+
+class CachedMenuListMixin:
+    """Serve the list action from the versioned menu cache"""
+    menu_cache_name = None
+
+    def list(self, request, *args, **kwargs):
+        parent = super()
+        return cached_menu_response(
+            request, self.menu_cache_name,
+            lambda: parent.list(request, *args, **kwargs).data
+        )
 
 # Full CRUD for Menu Categories
-class MenuCategoryViewSet(viewsets.ModelViewSet):
-    queryset = MenuCategory.objects.annotate(item_count=Count('items'))  # Keep this annotation
+class MenuCategoryViewSet(ConditionalMenuMixin, CachedMenuListMixin, viewsets.ModelViewSet):
+    queryset = MenuCategory.objects.annotate(item_count=Count('items')).prefetch_related(  # Keep this annotation
+        # Nested items, their category name and toppings load in a fixed number of queries
+        Prefetch(
+            'items',
+            queryset=MenuItem.objects.select_related('category').prefetch_related('extra_toppings')
+        )
+    )
     serializer_class = MenuCategorySerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     search_fields = ['name', 'description']
     ordering_fields = ['name', 'item_count']
     ordering = ['name']
+    menu_cache_name = 'categories'
+    validated_rows = 'categories'
 
 # Full CRUD for Menu Items
-class MenuItemViewSet(viewsets.ModelViewSet):
-    queryset = MenuItem.objects.select_related('category')
+class MenuItemViewSet(ConditionalMenuMixin, CachedMenuListMixin, viewsets.ModelViewSet):
+    queryset = MenuItem.objects.select_related('category').prefetch_related('extra_toppings')
     serializer_class = MenuItemSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
     filterset_fields = ['category', 'popular']
     search_fields = ['name', 'description']
+    search_indexes = {'pk': MENU_ITEM_INDEX}
     ordering_fields = ['name', 'price', 'popular']
     ordering = ['name']
+    menu_cache_name = 'items'
+    validated_rows = 'items'
+
+    def get_menu_fields(self):
+        """Sparse fieldset for reads (?fields= / ?view=compact); writes always use every field"""
+        if self.request.method not in permissions.SAFE_METHODS:
+            return None
+        return requested_menu_fields(self.request)
+
+    def get_queryset(self):
+        return sparse_menu_queryset(super().get_queryset(), self.get_menu_fields())
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['menu_fields'] = self.get_menu_fields()
+        return context
 
     # Custom action to get items by category
     @action(detail=False, methods=['get'])
@@ -37,25 +125,58 @@ class ExtraToppingViewSet(viewsets.ModelViewSet):
     serializer_class = ExtraToppingSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
+def ranked_menu_response(request, name, limit=None):
+    """
+    Serve the best sellers for ``?window=`` (24h/7d/30d, default 7d) from the
+    materialized ranking, falling back to the hand-set popular flag until
+    there are sales to rank.
+    """
+    window = request.query_params.get('window', '7d')
+    if window not in TOP_SELLER_WINDOWS:
+        return Response(
+            {"error": f"window must be one of {', '.join(TOP_SELLER_WINDOWS)}"}, status=400
+        )
+    ranking = [menu_item_id for menu_item_id, _ in top_sellers(window)][:limit]
+    fields = requested_menu_fields(request)
+
+    def build():
+        queryset = sparse_menu_queryset(
+            MenuItem.objects.select_related('category').prefetch_related('extra_toppings'), fields
+        )
+        if ranking:
+            by_id = queryset.in_bulk(ranking)
+            items = [by_id[pk] for pk in ranking if pk in by_id]
+        else:
+            items = queryset.filter(popular=True)[:limit]
+        return MenuItemSerializer(items, many=True, context={'menu_fields': fields}).data
+
+    # The ranking is part of the key, so a re-rank shows up without a menu version bump
+    ranking_key = ','.join(str(pk) for pk in ranking)
+    return cached_menu_response(request, f'{name}:{window}:{ranking_key}', build)
+
 # Keep your existing function-based views for specific endpoints
 @api_view(['GET'])
 def featured_items(request):
-    featured = MenuItem.objects.filter(popular=True)[:6]
-    serializer = MenuItemSerializer(featured, many=True)
-    return Response(serializer.data)
+    return ranked_menu_response(request, 'featured', limit=6)
 
 @api_view(['GET'])
 def popular_items(request):
-    popular = MenuItem.objects.filter(popular=True)
-    serializer = MenuItemSerializer(popular, many=True)
-    return Response(serializer.data)
+    return ranked_menu_response(request, 'popular')
 
 @api_view(['GET'])
 def menu_by_category(request, category_id):
-    try:
+    def build():
         category = MenuCategory.objects.get(id=category_id)
-        items = MenuItem.objects.filter(category=category)
-        serializer = MenuItemSerializer(items, many=True)
-        return Response(serializer.data)
+        fields = requested_menu_fields(request)
+        items = sparse_menu_queryset(MenuItem.objects.filter(category=category), fields)
+        return MenuItemSerializer(items, many=True, context={'menu_fields': fields}).data
+
+    try:
+        return conditional_menu_response(
+            request,
+            MenuItem.objects.filter(category_id=category_id),
+            MenuCategory.objects.filter(id=category_id),
+            lambda: cached_menu_response(request, f'category:{category_id}', build)
+        )
     except MenuCategory.DoesNotExist:
         return Response({"error": "Category not found"}, status=404)
\ No newline at end of file
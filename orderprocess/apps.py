@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class OrderprocessConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orderprocess'
+
+    def ready(self):
+        from . import checks  # noqa: F401
+        if settings.CART_REAPER_INTERVAL:
+            from django.core.signals import request_started
+            from .reaper import start_scheduler
+            request_started.connect(start_scheduler, dispatch_uid='orderprocess.cart_reaper')
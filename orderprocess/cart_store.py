@@ -0,0 +1,235 @@
+import time
+import uuid
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from menu.models import MenuItem
+from .models import Cart, CartItem, cart_line_signature
+
+# Session entry holding the token of an anonymous visitor's cached cart
+CART_TOKEN_SESSION_KEY = 'cart_token'
+# Seconds before a cart lock left behind by a crashed request expires
+CART_LOCK_TIMEOUT = 5
+
+
+def cart_cache_key(token):
+    return f'orderprocess:cart:{token}'
+
+
+def cart_lock_key(token):
+    return f'orderprocess:cart:{token}:lock'
+
+
+class CachedCart:
+    """
+    An anonymous cart kept in the cache instead of the database.
+
+    It offers the same cart methods as ``Cart`` (and the attributes
+    ``CartSerializer`` reads), so the cart views work with either. Nothing
+    is stored until the first change, and the lines only become
+    ``Cart``/``CartItem`` rows at checkout (``persist()``) or when the
+    visitor logs in (``merge_into()``).
+    """
+    id = None
+    user = None
+
+    def __init__(self, request, token=None, data=None):
+        data = data or {}
+        now = timezone.now()
+        self.request = request
+        self.token = token
+        self.lines = data.get('lines', [])
+        self.created_at = parse_datetime(data['created_at']) if 'created_at' in data else now
+        self.updated_at = parse_datetime(data['updated_at']) if 'updated_at' in data else now
+        self.items = []
+
+    @classmethod
+    def for_request(cls, request):
+        """The visitor's cached cart, or a new empty one if it expired or never existed"""
+        token = request.session.get(CART_TOKEN_SESSION_KEY)
+        data = cache.get(cart_cache_key(token)) if token else None
+        if data is None:
+            return cls(request)
+        return cls(request, token, data)
+
+    @property
+    def session_key(self):
+        return self.request.session.session_key
+
+    def save(self):
+        if self.token is None:
+            self.token = uuid.uuid4().hex
+            self.request.session[CART_TOKEN_SESSION_KEY] = self.token
+        self.updated_at = timezone.now()
+        cache.set(cart_cache_key(self.token), {
+            'lines': self.lines,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat(),
+        }, settings.CART_CACHE_TIMEOUT)
+
+    @contextmanager
+    def locked(self):
+        """
+        Hold the cart's lock while changing it, starting from the stored lines.
+        
+        Every change is a read-modify-write of the whole cart, so two requests
+        of one visitor (say, two quick adds) would otherwise each save their
+        own copy and lose the other's line. cache.add only succeeds for one
+        caller, which makes it the lock; the others wait for it.
+        """
+        if self.token is None:
+            # Nothing stored yet, so nothing to overwrite
+            yield
+            return
+        lock = cart_lock_key(self.token)
+        while not cache.add(lock, True, CART_LOCK_TIMEOUT):
+            time.sleep(0.01)
+        try:
+            data = cache.get(cart_cache_key(self.token))
+            self.lines = data['lines'] if data else []
+            yield
+        finally:
+            cache.delete(lock)
+
+    def discard(self):
+        """Forget the cached cart once its lines live in the database"""
+        if self.token is not None:
+            cache.delete(cart_cache_key(self.token))
+            self.request.session.pop(CART_TOKEN_SESSION_KEY, None)
+            self.token = None
+        self.lines = []
+
+    def as_item(self, line, menu_item=None):
+        """An unsaved CartItem for a cached line, for serializing and logging"""
+        item = CartItem(
+            id=uuid.UUID(line['id']),
+            menu_item_id=line['menu_item'],
+            quantity=line['quantity'],
+            price=Decimal(line['price']),
+            extras=line['extras'],
+            spice_level=line['spice_level'],
+            special_notes=line['special_notes'],
+            created_at=parse_datetime(line['created_at']),
+        )
+        if menu_item is not None:
+            item.menu_item = menu_item
+        return item
+
+    @staticmethod
+    def line_signature(line):
+        return cart_line_signature(line['menu_item'], line['extras'], line['spice_level'], line['special_notes'])
+
+    def find_line(self, item_id):
+        for line in self.lines:
+            if line['id'] == str(item_id):
+                return line
+        raise CartItem.DoesNotExist(f"Cart item {item_id} not found")
+
+    def is_empty(self):
+        return not self.lines
+
+    def add_item(self, menu_item, quantity=1, extras=None, spice_level='', special_notes='', price=None):
+        """Add a line, or top up the line with the same customizations; returns (item, created)"""
+        extras = extras or []
+        signature = cart_line_signature(menu_item.pk, extras, spice_level, special_notes)
+        with self.locked():
+            for line in self.lines:
+                if self.line_signature(line) == signature:
+                    line['quantity'] += quantity
+                    self.save()
+                    return self.as_item(line, menu_item), False
+
+            line = {
+                'id': str(uuid.uuid4()),
+                'menu_item': menu_item.pk,
+                'quantity': quantity,
+                'price': str(menu_item.price if price is None else price),
+                'extras': extras,
+                'spice_level': spice_level,
+                'special_notes': special_notes,
+                'created_at': timezone.now().isoformat(),
+            }
+            self.lines.append(line)
+            self.save()
+        return self.as_item(line, menu_item), True
+
+    def set_item_quantity(self, item_id, quantity):
+        """Change a line's quantity, deleting it at zero; raises CartItem.DoesNotExist"""
+        with self.locked():
+            line = self.find_line(item_id)
+            if quantity <= 0:
+                self.lines.remove(line)
+            else:
+                line['quantity'] = quantity
+            self.save()
+
+    def remove_item(self, item_id):
+        """Delete one line; raises CartItem.DoesNotExist"""
+        with self.locked():
+            self.lines.remove(self.find_line(item_id))
+            self.save()
+
+    def clear(self):
+        """Delete every line and return how many there were"""
+        if self.token is None:
+            return 0
+        with self.locked():
+            count = len(self.lines)
+            self.lines = []
+            self.save()
+        return count
+
+    def for_display(self):
+        """Load the lines' menu items (with category and toppings) in two queries"""
+        menu_items = MenuItem.objects.select_related('category').prefetch_related(
+            'extra_toppings'
+        ).in_bulk({line['menu_item'] for line in self.lines})
+        # Lines whose menu item has since been deleted drop out, like the cascade on CartItem
+        self.items = [
+            self.as_item(line, menu_items[line['menu_item']])
+            for line in self.lines if line['menu_item'] in menu_items
+        ]
+        return self
+
+    def totals(self):
+        """Return (total_items, subtotal) over the lines"""
+        quantity = sum(line['quantity'] for line in self.lines)
+        subtotal = sum((Decimal(line['price']) * line['quantity'] for line in self.lines), Decimal('0'))
+        return quantity, subtotal.quantize(Decimal('0.01'))
+
+    @property
+    def total_items(self):
+        return self.totals()[0]
+
+    @property
+    def subtotal(self):
+        return self.totals()[1]
+
+    def merge_into(self, cart):
+        """Write the cached lines into a database cart and forget the cached copy"""
+        if not self.lines:
+            self.discard()
+            return cart
+
+        # Lines whose menu item has since been deleted are dropped; the rest keep
+        # the price the visitor saw and go in with one bulk upsert
+        menu_item_ids = set(MenuItem.objects.filter(
+            pk__in={line['menu_item'] for line in self.lines}
+        ).values_list('pk', flat=True))
+        cart.merge_lines([
+            self.as_item(line) for line in self.lines if line['menu_item'] in menu_item_ids
+        ])
+        self.discard()
+        return cart
+
+    def persist(self):
+        """Turn the cached cart into the session's Cart row, for checkout"""
+        if not self.request.session.session_key:
+            self.request.session.create()
+        cart, _ = Cart.objects.get_or_create(session_key=self.request.session.session_key)
+        return self.merge_into(cart)
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core import checks
+
+
+@checks.register()
+def check_cart_backend(app_configs, **kwargs):
+    """
+    CART_BACKEND = 'cache' needs a cache every server process shares: with a
+    per-process local-memory cache a visitor's cart vanishes or forks as
+    requests land on different workers, and a restart empties every cart.
+    """
+    if settings.CART_BACKEND != 'cache':
+        return []
+    backend = settings.CACHES['default']['BACKEND']
+    if backend.endswith('.LocMemCache') or backend.endswith('.DummyCache'):
+        return [checks.Error(
+            f"CART_BACKEND = 'cache' needs a shared cache, but the default cache is {backend}.",
+            hint="Point CACHES['default'] at Redis or Memcached, or set CART_BACKEND = 'db'.",
+            id='orderprocess.E001',
+        )]
+    return []
@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from orderprocess.reaper import format_report, reap_expired
+
+
+class Command(BaseCommand):
+    help = 'Delete expired checkout sessions, expired sessions, and abandoned anonymous carts in batches'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.CART_REAPER_BATCH_SIZE,
+            help='Rows deleted per transaction'
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0,
+            help='Seconds to sleep between batches, to leave room for other writers'
+        )
+    
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1')
+        
+        report = reap_expired(options['batch_size'], options['pause'])
+        self.stdout.write(self.style.SUCCESS(f'Reaped {format_report(report)}'))
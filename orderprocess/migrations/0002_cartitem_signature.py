@@ -0,0 +1,58 @@
+import hashlib
+import json
+
+from django.db import migrations, models
+
+
+def line_signature(item):
+    # Frozen copy of orderprocess.models.cart_line_signature
+    canonical = json.dumps(
+        [item.menu_item_id, sorted(item.extras or []), item.spice_level or '', item.special_notes or ''],
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def populate_signatures(apps, schema_editor):
+    CartItem = apps.get_model('orderprocess', 'CartItem')
+
+    seen = {}
+    updated, duplicates = [], []
+    for item in CartItem.objects.order_by('created_at').iterator(chunk_size=2000):
+        item.signature = line_signature(item)
+        key = (item.cart_id, item.signature)
+        if key in seen:
+            # Same line stored twice (e.g. extras in another order) - fold into the first
+            seen[key].quantity += item.quantity
+            duplicates.append(item.pk)
+        else:
+            seen[key] = item
+            updated.append(item)
+
+    CartItem.objects.filter(pk__in=duplicates).delete()
+    CartItem.objects.bulk_update(updated, ['signature', 'quantity'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orderprocess', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterUniqueTogether(
+            name='cartitem',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='cartitem',
+            name='signature',
+            field=models.CharField(default='', editable=False, max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_signatures, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'signature'), name='unique_cart_line_signature'),
+        ),
+    ]
@@ -1,7 +1,43 @@
 from django.db import models
+import hashlib
+import json
 import uuid
+from decimal import Decimal
 from django.contrib.sessions.models import Session
 
+def cart_subtotal_expression(prefix=''):
+    """Sum of price * quantity over cart lines"""
+    return models.Sum(
+        models.F(f'{prefix}price') * models.F(f'{prefix}quantity'),
+        output_field=models.DecimalField(max_digits=10, decimal_places=2)
+    )
+
+def cart_line_signature(menu_item_id, extras, spice_level, special_notes):
+    """
+    Canonical hash of what makes two cart lines the same line: the menu item,
+    its extras in any order, the spice level and the notes (blank == None).
+    """
+    canonical = json.dumps(
+        [menu_item_id, sorted(extras or []), spice_level or '', special_notes or ''],
+        separators=(',', ':')
+    )
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+class CartQuerySet(models.QuerySet):
+    def with_totals(self):
+        """Annotate item quantity and subtotal so the serializer needs no extra queries"""
+        return self.annotate(
+            items_total_quantity=models.Sum('items__quantity'),
+            items_subtotal=cart_subtotal_expression('items__'),
+        )
+    
+    def for_display(self):
+        """Totals plus every line with its menu item, category and toppings in three queries"""
+        lines = CartItem.objects.select_related('menu_item__category').prefetch_related(
+            'menu_item__extra_toppings'
+        ).order_by('created_at')
+        return self.with_totals().prefetch_related(models.Prefetch('items', queryset=lines))
+
 class Cart(models.Model):
     """Shopping cart model - can be session-based or user-based"""
     session_key = models.CharField(max_length=40, unique=True, null=True, blank=True)
@@ -9,18 +45,116 @@ class Cart(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = CartQuerySet.as_manager()
+    
     def __str__(self):
         if self.user:
             return f"Cart for {self.user.email}"
         return f"Session Cart ({self.session_key})"
     
+    def totals(self):
+        """Return (total_items, subtotal), from with_totals() annotations or one aggregate"""
+        if hasattr(self, 'items_subtotal'):
+            quantity, subtotal = self.items_total_quantity, self.items_subtotal
+        else:
+            result = self.items.aggregate(
+                total_quantity=models.Sum('quantity'),
+                subtotal=cart_subtotal_expression()
+            )
+            quantity, subtotal = result['total_quantity'], result['subtotal']
+        # SQLite sums decimals as floats - quantize back to exact cents
+        return quantity or 0, (subtotal or Decimal('0')).quantize(Decimal('0.01'))
+    
     @property
     def total_items(self):
-        return self.items.aggregate(total=models.Sum('quantity'))['total'] or 0
+        return self.totals()[0]
     
     @property
     def subtotal(self):
-        return sum(item.total_price for item in self.items.all())
+        return self.totals()[1]
+    
+    def is_empty(self):
+        return not self.items.exists()
+    
+    def add_item(self, menu_item, quantity=1, extras=None, spice_level='', special_notes='', price=None):
+        """Add a line, or top up the line with the same customizations; returns (item, created)"""
+        extras = extras or []
+        signature = cart_line_signature(menu_item.pk, extras, spice_level, special_notes)
+        
+        # One lookup on the (cart, signature) unique index finds a line with the same customizations
+        item = self.items.filter(signature=signature).first()
+        if item is not None:
+            item.quantity += quantity
+            item.save(update_fields=['quantity'])
+            return item, False
+        
+        item = CartItem.objects.create(
+            cart=self,
+            menu_item=menu_item,
+            quantity=quantity,
+            price=menu_item.price if price is None else price,
+            extras=extras,
+            spice_level=spice_level,
+            special_notes=special_notes
+        )
+        return item, True
+    
+    def merge_lines(self, lines):
+        """
+        Fold unsaved CartItem lines (e.g. another cart's) into this cart with
+        one lookup of the matching lines and one bulk upsert, adding quantities
+        of lines with the same signature.
+        """
+        incoming = {}
+        for line in lines:
+            line.signature = line.line_signature()
+            if line.signature in incoming:
+                incoming[line.signature].quantity += line.quantity
+            else:
+                incoming[line.signature] = line
+        if not incoming:
+            return
+        
+        existing = dict(
+            self.items.filter(signature__in=incoming).values_list('signature', 'quantity')
+        )
+        merged = []
+        for signature, line in incoming.items():
+            merged.append(CartItem(
+                cart=self,
+                menu_item_id=line.menu_item_id,
+                quantity=line.quantity + existing.get(signature, 0),
+                price=line.price,
+                extras=line.extras,
+                spice_level=line.spice_level,
+                special_notes=line.special_notes,
+                signature=signature,
+            ))
+        # Existing lines keep their id and price, only the quantity moves
+        CartItem.objects.bulk_create(
+            merged,
+            update_conflicts=True,
+            unique_fields=['cart', 'signature'],
+            update_fields=['quantity'],
+        )
+    
+    def set_item_quantity(self, item_id, quantity):
+        """Change a line's quantity, deleting it at zero; raises CartItem.DoesNotExist"""
+        item = self.items.get(id=item_id)
+        if quantity <= 0:
+            item.delete()
+        else:
+            item.quantity = quantity
+            item.save()
+    
+    def remove_item(self, item_id):
+        """Delete one line; raises CartItem.DoesNotExist"""
+        self.items.get(id=item_id).delete()
+    
+    def clear(self):
+        """Delete every line and return how many there were"""
+        count, _ = self.items.all().delete()
+        return count
 
 class CartItem(models.Model):
     """Individual items in the cart"""
@@ -37,10 +171,15 @@ class CartItem(models.Model):
     # Cached price at time of adding to cart
     price = models.DecimalField(max_digits=10, decimal_places=2)
     
+    # cart_line_signature() of the line, kept in sync by save()
+    signature = models.CharField(max_length=64, editable=False)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
-        unique_together = ['cart', 'menu_item', 'extras', 'spice_level']
+        constraints = [
+            models.UniqueConstraint(fields=['cart', 'signature'], name='unique_cart_line_signature'),
+        ]
     
     def __str__(self):
         return f"{self.quantity}x {self.menu_item.name}"
@@ -49,10 +188,17 @@ class CartItem(models.Model):
     def total_price(self):
         return self.price * self.quantity
     
+    def line_signature(self):
+        return cart_line_signature(self.menu_item_id, self.extras, self.spice_level, self.special_notes)
+    
     def save(self, *args, **kwargs):
         # Auto-set price from menu item if not set
         if not self.price and self.menu_item:
             self.price = self.menu_item.price
+        self.signature = self.line_signature()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'signature' not in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'signature'}
         super().save(*args, **kwargs)
 
 class CheckoutSession(models.Model):
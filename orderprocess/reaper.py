@@ -0,0 +1,105 @@
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.db import close_old_connections, transaction
+from django.db.models import Exists, OuterRef, Q
+from django.utils import timezone
+
+from .models import Cart, CheckoutSession
+
+logger = logging.getLogger(__name__)
+
+
+def delete_in_batches(queryset, batch_size=500, pause=0):
+    """
+    Delete the rows of ``queryset`` a batch of primary keys at a time.
+
+    Each batch is its own short transaction, so the write lock is released
+    between batches (optionally ``pause`` seconds) and readers never wait
+    behind one long delete. Returns the number of rows removed.
+    """
+    model = queryset.model
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by().values_list('pk', flat=True)[:batch_size])
+        if not pks:
+            return deleted
+        with transaction.atomic():
+            # Cascades (cart lines, checkout sessions) go in the same batch
+            _, per_model = model.objects.filter(pk__in=pks).delete()
+        deleted += per_model.get(model._meta.label, 0)
+        if pause:
+            time.sleep(pause)
+
+
+def expired_querysets(now):
+    """What the reaper removes, in the order it removes it"""
+    live_session = Session.objects.filter(session_key=OuterRef('session_key'), expire_date__gt=now)
+    return [
+        ('checkout sessions', CheckoutSession.objects.filter(expires_at__lt=now)),
+        ('sessions', Session.objects.filter(expire_date__lt=now)),
+        # Anonymous carts outlive nothing but their session; user carts are kept
+        ('carts', Cart.objects.filter(user__isnull=True).filter(
+            Q(session_key__isnull=True) | ~Exists(live_session)
+        )),
+    ]
+
+
+def reap_expired(batch_size=500, pause=0, now=None):
+    """
+    Delete expired checkout sessions, expired django sessions and the
+    anonymous carts left without a live session.
+
+    Returns ``{kind: (rows, seconds)}`` so callers can report throughput.
+    """
+    now = now or timezone.now()
+    report = {}
+    for kind, queryset in expired_querysets(now):
+        started = time.monotonic()
+        rows = delete_in_batches(queryset, batch_size, pause)
+        report[kind] = (rows, time.monotonic() - started)
+    return report
+
+
+def format_report(report):
+    return ', '.join(
+        f"{kind}: {rows} in {seconds:.2f}s ({rows / seconds if seconds else 0:.0f}/s)"
+        for kind, (rows, seconds) in report.items()
+    )
+
+
+_scheduler_lock = threading.Lock()
+_scheduler = None
+
+
+def _run_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            report = reap_expired(settings.CART_REAPER_BATCH_SIZE)
+            logger.info(f"Cart reaper: {format_report(report)}")
+        except Exception as e:
+            logger.error(f"Cart reaper failed: {str(e)}")
+        finally:
+            close_old_connections()
+
+
+def start_scheduler(**kwargs):
+    """
+    Start the in-process reaper thread (every CART_REAPER_INTERVAL seconds).
+
+    Hooked to request_started, so it only ever runs in processes that serve
+    requests - never in migrate, shell or the test runner.
+    """
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is not None:
+            return
+        _scheduler = threading.Thread(
+            target=_run_periodically, args=(settings.CART_REAPER_INTERVAL,),
+            name='cart-reaper', daemon=True
+        )
+        _scheduler.start()
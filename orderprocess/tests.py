@@ -1,3 +1,233 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from menu.models import ExtraTopping
+from menu.testing import make_menu_item
+from orders.models import Order
+from users.models import CustomUser
+from .cart_store import CART_TOKEN_SESSION_KEY, CachedCart, cart_lock_key
+from .checks import check_cart_backend
+from .models import Cart, CartItem, CheckoutSession
+
+
+class CartTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        topping = ExtraTopping.objects.create(name='Cheese', price='1.00')
+        self.dishes = [make_menu_item(f'Dish {i}') for i in range(6)]
+        for dish in self.dishes:
+            dish.extra_toppings.add(topping)
+
+    def add_to_cart(self, dish, quantity=1):
+        response = self.client.post(
+            '/api/orderprocess/cart/add/', {'menu_item_id': dish.id, 'quantity': quantity}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response
+
+
+@override_settings(CART_BACKEND='db')
+class CartQueryCountTests(CartTestCase):
+    """Cart responses must cost a fixed number of queries however many lines the cart has"""
+
+    # Cart lookup + cart with totals + lines with menu items + toppings
+    GET_QUERIES = 4
+    # Cart lookup + menu item + matching line + line update + the GET_QUERIES reload
+    ADD_EXISTING_QUERIES = 7
+
+    def test_get_cart_query_count_is_fixed(self):
+        self.add_to_cart(self.dishes[0])
+        with self.assertNumQueries(self.GET_QUERIES):
+            self.client.get('/api/orderprocess/cart/')
+
+        for dish in self.dishes[1:]:
+            self.add_to_cart(dish, quantity=2)
+        with self.assertNumQueries(self.GET_QUERIES):
+            response = self.client.get('/api/orderprocess/cart/')
+
+        cart = response.json()
+        self.assertEqual(len(cart['items']), 6)
+        self.assertEqual(cart['total_items'], 11)
+        self.assertEqual(str(cart['subtotal']), '109.89')
+        self.assertEqual(cart['items'][0]['menu_item_details']['category_name'], 'Lunch')
+        self.assertEqual(len(cart['items'][0]['menu_item_details']['extra_toppings']), 1)
+
+    def test_add_to_cart_query_count_is_fixed(self):
+        self.add_to_cart(self.dishes[0])
+        with self.assertNumQueries(self.ADD_EXISTING_QUERIES):
+            self.add_to_cart(self.dishes[0])
+
+        for dish in self.dishes[1:]:
+            self.add_to_cart(dish)
+        with self.assertNumQueries(self.ADD_EXISTING_QUERIES):
+            response = self.add_to_cart(self.dishes[0])
+        self.assertEqual(len(response.json()['cart']['items']), 6)
+
+
+@override_settings(CART_BACKEND='db')
+class CartLineMergeTests(CartTestCase):
+    """Lines with the same customizations share one row, whatever the extras order"""
+
+    def add_with_extras(self, dish, extras, quantity=1):
+        return self.client.post(
+            '/api/orderprocess/cart/add/',
+            {'menu_item_id': dish.id, 'quantity': quantity, 'extras': extras},
+            format='json'
+        )
+
+    def test_same_line_is_topped_up(self):
+        self.add_with_extras(self.dishes[0], ['cheese', 'olives'])
+        cart = self.add_with_extras(self.dishes[0], ['olives', 'cheese'], 2).json()['cart']
+        self.assertEqual([item['quantity'] for item in cart['items']], [3])
+
+    def test_login_merges_session_lines_into_user_cart(self):
+        user = CustomUser.objects.create_user(username='guest', email='guest@example.com', password='x')
+        user_cart = Cart.objects.create(user=user)
+        user_cart.add_item(self.dishes[0], 1, ['olives', 'cheese'])
+
+        self.add_with_extras(self.dishes[0], ['cheese', 'olives'], 2)
+        self.add_with_extras(self.dishes[1], [])
+        self.client.force_authenticate(user)
+        cart = self.client.get('/api/orderprocess/cart/').json()
+
+        self.assertEqual(cart['id'], user_cart.id)
+        quantities = {item['menu_item']: item['quantity'] for item in cart['items']}
+        self.assertEqual(quantities, {self.dishes[0].id: 3, self.dishes[1].id: 1})
+        self.assertEqual(Cart.objects.count(), 1)
+
+
+@override_settings(CART_BACKEND='cache')
+class CachedCartTests(CartTestCase):
+    """Anonymous carts stay in the cache until checkout or login"""
+
+    # Session + menu items with categories + toppings
+    GET_QUERIES = 3
+
+    checkout_data = {
+        'first_name': 'Test', 'last_name': 'Guest', 'email': 'guest@example.com',
+        'phone': '0700000000', 'delivery_type': 'pickup', 'payment_method': 'cash',
+    }
+
+    def test_browsing_writes_nothing(self):
+        response = self.client.get('/api/orderprocess/cart/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['items'], [])
+        self.assertFalse(Session.objects.exists())
+        self.assertFalse(Cart.objects.exists())
+
+    def test_cart_actions_stay_in_the_cache(self):
+        self.add_to_cart(self.dishes[0])
+        self.add_to_cart(self.dishes[0], quantity=2)
+        cart = self.add_to_cart(self.dishes[1]).json()['cart']
+        self.assertEqual([item['quantity'] for item in cart['items']], [3, 1])
+
+        line = cart['items'][1]['id']
+        self.client.put(f'/api/orderprocess/cart/update/{line}/', {'quantity': 4}, format='json')
+        with self.assertNumQueries(self.GET_QUERIES):
+            cart = self.client.get('/api/orderprocess/cart/').json()
+        self.assertEqual(cart['total_items'], 7)
+        self.assertEqual(str(cart['subtotal']), '69.93')
+        self.assertEqual(cart['items'][0]['menu_item_details']['category_name'], 'Lunch')
+
+        response = self.client.delete(f'/api/orderprocess/cart/remove/{line}/')
+        self.assertEqual(len(response.json()['cart']['items']), 1)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+
+    def test_checkout_persists_the_cart(self):
+        self.add_to_cart(self.dishes[0], quantity=2)
+        self.add_to_cart(self.dishes[1])
+
+        response = self.client.post('/api/orderprocess/checkout/create-session/', self.checkout_data, format='json')
+        self.assertEqual(response.status_code, 200)
+        cart = Cart.objects.get()
+        self.assertEqual(cart.total_items, 3)
+        self.assertEqual(response.json()['cart_details']['id'], cart.id)
+
+        response = self.client.post('/api/orderprocess/checkout/process-order/')
+        self.assertEqual(response.status_code, 200)
+        order = Order.objects.get()
+        self.assertEqual(order.items.count(), 2)
+        self.assertEqual(str(order.total_amount), '29.97')
+
+    def test_login_merges_the_cached_cart(self):
+        self.add_to_cart(self.dishes[0], quantity=2)
+        user = CustomUser.objects.create_user(username='guest', email='guest@example.com', password='x')
+        self.client.force_authenticate(user)
+
+        cart = self.client.get('/api/orderprocess/cart/').json()
+        self.assertEqual(cart['user'], user.id)
+        self.assertEqual(cart['total_items'], 2)
+        self.assertEqual(Cart.objects.get(user=user).items.count(), 1)
+
+    def test_concurrent_changes_keep_each_others_lines(self):
+        self.add_to_cart(self.dishes[0])
+        token = self.client.session[CART_TOKEN_SESSION_KEY]
+        request = SimpleNamespace(session={CART_TOKEN_SESSION_KEY: token})
+
+        # Two requests loaded the cart before either saved
+        first, second = CachedCart.for_request(request), CachedCart.for_request(request)
+        first.add_item(self.dishes[1])
+        second.add_item(self.dishes[2], quantity=2)
+        second.set_item_quantity(first.lines[0]['id'], 5)
+
+        cart = self.client.get('/api/orderprocess/cart/').json()
+        quantities = {item['menu_item']: item['quantity'] for item in cart['items']}
+        self.assertEqual(quantities, {self.dishes[0].id: 5, self.dishes[1].id: 1, self.dishes[2].id: 2})
+        self.assertIsNone(cache.get(cart_lock_key(token)))
+
+
+class CartBackendCheckTests(TestCase):
+
+    def test_cache_backend_needs_a_shared_cache(self):
+        with override_settings(CART_BACKEND='db'):
+            self.assertEqual(check_cart_backend(None), [])
+        with override_settings(CART_BACKEND='cache'):
+            self.assertEqual([error.id for error in check_cart_backend(None)], ['orderprocess.E001'])
+        with override_settings(CART_BACKEND='cache', CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://localhost'}
+        }):
+            self.assertEqual(check_cart_backend(None), [])
+
+
+class ReapExpiredCartsTests(TestCase):
+    """The reaper removes only expired sessions, checkouts and orphaned anonymous carts"""
+
+    def make_session(self, key, expires_in):
+        return Session.objects.create(
+            session_key=key, session_data='', expire_date=timezone.now() + timedelta(days=expires_in)
+        )
+
+    def test_reaps_expired_rows_in_batches(self):
+        dish = make_menu_item('Dish')
+        self.make_session('live', 1)
+        self.make_session('gone', -1)
+        live_cart = Cart.objects.create(session_key='live')
+        abandoned = [Cart.objects.create(session_key=f'old{i}') for i in range(3)]
+        user = CustomUser.objects.create_user(username='guest', email='guest@example.com', password='x')
+        user_cart = Cart.objects.create(user=user)
+        for cart in [live_cart, user_cart, *abandoned]:
+            cart.add_item(dish)
+        CheckoutSession.objects.create(
+            cart=live_cart, customer_data={}, shipping_option={},
+            expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        out = StringIO()
+        call_command('reap_expired_carts', '--batch-size', '2', stdout=out)
+
+        self.assertIn('carts: 3', out.getvalue())
+        self.assertEqual(set(Cart.objects.values_list('pk', flat=True)), {live_cart.pk, user_cart.pk})
+        self.assertEqual(CartItem.objects.count(), 2)
+        self.assertEqual(list(Session.objects.values_list('session_key', flat=True)), ['live'])
+        self.assertFalse(CheckoutSession.objects.exists())
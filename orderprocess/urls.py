@@ -17,4 +17,5 @@ urlpatterns = [
     
     # Order confirmation
     path('confirmation/<uuid:order_id>/', views.get_order_confirmation, name='order-confirmation'),
+    path('confirmation/<str:order_number>/', views.get_order_confirmation, name='order-confirmation-by-number'),
 ]
\ No newline at end of file
@@ -5,12 +5,14 @@ from rest_framework.response import Response
 from django.utils import timezone
 from datetime import timedelta
 from django.db import transaction
+from django.conf import settings
 from .models import Cart, CartItem, CheckoutSession
+from .cart_store import CachedCart
 from .serializers import (
     CartSerializer, CartItemSerializer, CheckoutSessionSerializer,
     AddToCartSerializer, CheckoutDataSerializer
 )
-from orders.models import Order, OrderItem
+from orders.models import Order, parse_order_code
 from menu.models import MenuItem
 import logging
 
@@ -22,9 +24,9 @@ logger = logging.getLogger(__name__)
 def get_cart(request):
     """Get or create cart for current session/user"""
     try:
-        cart = get_or_create_cart(request)
+        cart = cart_for_display(get_or_create_cart(request))
         serializer = CartSerializer(cart)
-        logger.info(f"Cart retrieved: {cart.id}, session: {request.session.session_key}, items: {cart.items.count()}")
+        logger.info(f"Cart retrieved: {cart.id}, session: {request.session.session_key}, items: {len(serializer.data['items'])}")
         return Response(serializer.data)
     except Exception as e:
         logger.error(f"Error getting cart: {str(e)}")
@@ -42,45 +44,20 @@ def add_to_cart(request):
         cart = get_or_create_cart(request)
         menu_item = MenuItem.objects.get(id=serializer.validated_data['menu_item_id'])
         
-        # FIXED: More flexible item matching
-        extras = serializer.validated_data.get('extras', [])
-        spice_level = serializer.validated_data.get('spice_level', '')
-        special_notes = serializer.validated_data.get('special_notes', '')
-        
-        # Try to find existing cart item with same customizations
-        existing_items = CartItem.objects.filter(
-            cart=cart,
-            menu_item=menu_item,
-            spice_level=spice_level,
-            special_notes=special_notes
+        # FIXED: More flexible item matching - lines with the same customizations are topped up
+        cart_item, created = cart.add_item(
+            menu_item,
+            quantity=serializer.validated_data['quantity'],
+            extras=serializer.validated_data.get('extras', []),
+            spice_level=serializer.validated_data.get('spice_level', ''),
+            special_notes=serializer.validated_data.get('special_notes', '')
         )
-        
-        # Check if any existing item has the same extras (order doesn't matter)
-        cart_item = None
-        for item in existing_items:
-            if sorted(item.extras) == sorted(extras):
-                cart_item = item
-                break
-        
-        if cart_item:
-            # Update existing item
-            cart_item.quantity += serializer.validated_data['quantity']
-            cart_item.save()
-            logger.info(f"Updated existing cart item: {cart_item.id}, new quantity: {cart_item.quantity}")
-        else:
-            # Create new item
-            cart_item = CartItem.objects.create(
-                cart=cart,
-                menu_item=menu_item,
-                quantity=serializer.validated_data['quantity'],
-                price=menu_item.price,
-                extras=extras,
-                spice_level=spice_level,
-                special_notes=special_notes
-            )
+        if created:
             logger.info(f"Created new cart item: {cart_item.id} for cart: {cart.id}")
+        else:
+            logger.info(f"Updated existing cart item: {cart_item.id}, new quantity: {cart_item.quantity}")
         
-        cart_serializer = CartSerializer(cart)
+        cart_serializer = CartSerializer(cart_for_display(cart))
         return Response({
             'success': True,
             'message': 'Item added to cart',
@@ -100,18 +77,15 @@ def update_cart_item(request, item_id):
     """Update cart item quantity"""
     try:
         cart = get_or_create_cart(request)
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
         new_quantity = request.data.get('quantity', 1)
+        cart.set_item_quantity(item_id, new_quantity)
         
         if new_quantity <= 0:
-            cart_item.delete()
             logger.info(f"Deleted cart item: {item_id}")
         else:
-            cart_item.quantity = new_quantity
-            cart_item.save()
             logger.info(f"Updated cart item: {item_id}, quantity: {new_quantity}")
         
-        cart_serializer = CartSerializer(cart)
+        cart_serializer = CartSerializer(cart_for_display(cart))
         return Response({
             'success': True,
             'cart': cart_serializer.data
@@ -127,11 +101,10 @@ def remove_cart_item(request, item_id):
     """Remove item from cart"""
     try:
         cart = get_or_create_cart(request)
-        cart_item = CartItem.objects.get(id=item_id, cart=cart)
-        cart_item.delete()
+        cart.remove_item(item_id)
         
         logger.info(f"Removed cart item: {item_id}")
-        cart_serializer = CartSerializer(cart)
+        cart_serializer = CartSerializer(cart_for_display(cart))
         return Response({
             'success': True,
             'message': 'Item removed from cart',
@@ -148,11 +121,10 @@ def clear_cart(request):
     """Clear entire cart"""
     try:
         cart = get_or_create_cart(request)
-        items_count = cart.items.count()
-        cart.items.all().delete()
+        items_count = cart.clear()
         
         logger.info(f"Cleared cart: {cart.id}, removed {items_count} items")
-        cart_serializer = CartSerializer(cart)
+        cart_serializer = CartSerializer(cart_for_display(cart))
         return Response({
             'success': True,
             'message': 'Cart cleared',
@@ -169,13 +141,16 @@ def create_checkout_session(request):
     """Create checkout session from cart"""
     cart = get_or_create_cart(request)
     
-    if cart.items.count() == 0:
+    if cart.is_empty():
         return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
     
     serializer = CheckoutDataSerializer(data=request.data)
     if not serializer.is_valid():
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    # Checkout needs real rows - a cached anonymous cart is written out here
+    cart = persisted_cart(cart)
+    
     # Create or update checkout session
     checkout_session, created = CheckoutSession.objects.get_or_create(
         cart=cart,
@@ -198,6 +173,7 @@ def create_checkout_session(request):
         checkout_session.expires_at = timezone.now() + timedelta(hours=1)
         checkout_session.save()
     
+    checkout_session.cart = cart_for_display(cart)
     session_serializer = CheckoutSessionSerializer(checkout_session)
     return Response(session_serializer.data)
 
@@ -206,7 +182,8 @@ def create_checkout_session(request):
 def process_order(request):
     """Process order from checkout session - FIXED to use correct Order model structure"""
     try:
-        cart = get_or_create_cart(request)
+        # Lines added after the checkout session was created are written out too
+        cart = persisted_cart(get_or_create_cart(request))
         checkout_session = CheckoutSession.objects.get(cart=cart)
         
         if checkout_session.expires_at < timezone.now():
@@ -231,7 +208,23 @@ def process_order(request):
                     address_parts.append(customer_data['zip_code'])
                 delivery_address = ', '.join(address_parts)
             
-            order = Order.objects.create(
+            # Cart lines, menu items and categories load in one query; the order
+            # and all of its lines are then inserted in bulk with the total computed once
+            cart_items = cart.items.select_related('menu_item__category')
+            lines = [
+                {
+                    'menu_item': cart_item.menu_item,
+                    'quantity': cart_item.quantity,
+                    'price_at_time': cart_item.price,
+                    # Store customizations if needed
+                    'custom_spice_level': cart_item.spice_level or 'default',
+                    'spice_notes': cart_item.special_notes or '',
+                }
+                for cart_item in cart_items
+            ]
+            
+            order = Order.create_with_items(
+                lines,
                 # Use the correct field names from your orders.Order model
                 customer_name=customer_name,
                 customer_email=customer_data['email'],
@@ -239,27 +232,8 @@ def process_order(request):
                 delivery_address=delivery_address,
                 order_type=customer_data['delivery_type'],  # 'delivery' or 'pickup'
                 status='pending',  # Use the correct status choices from orders app
-                total_amount=0  # Will be calculated from order items
             )
             
-            # Create order items using the CORRECT model structure
-            for cart_item in cart.items.all():
-                OrderItem.objects.create(
-                    order=order,
-                    menu_item=cart_item.menu_item,
-                    quantity=cart_item.quantity,
-                    price_at_time=cart_item.price,
-                    # Add cached fields for display
-                    cached_item_name=cart_item.menu_item.name,
-                    cached_item_category=cart_item.menu_item.category.name if cart_item.menu_item.category else "Uncategorized",
-                    # Store customizations if needed
-                    custom_spice_level=cart_item.spice_level or 'default',
-                    spice_notes=cart_item.special_notes or ''
-                )
-            
-            # Calculate total and save
-            order.calculate_total()
-            
             # Clear cart and checkout session
             cart.items.all().delete()
             checkout_session.delete()
@@ -267,7 +241,7 @@ def process_order(request):
             return Response({
                 'success': True,
                 'order_id': order.id,
-                'order_number': f"#{order.id.hex[:8].upper()}",
+                'order_number': f"#{order.code}",
                 'grand_total': float(order.total_amount),
                 'estimated_delivery': '25-35 minutes'
             })
@@ -281,10 +255,13 @@ def process_order(request):
 # ===== ORDER CONFIRMATION ENDPOINTS =====
 @api_view(['GET'])
 @permission_classes([AllowAny])
-def get_order_confirmation(request, order_id):
-    """Get order details for confirmation page"""
+def get_order_confirmation(request, order_id=None, order_number=None):
+    """Get order details for confirmation page, by order id or by order number ('#ABCD1234')"""
     try:
-        order = Order.objects.get(id=order_id)
+        if order_id is not None:
+            order = Order.objects.get(id=order_id)
+        else:
+            order = Order.objects.get(code=parse_order_code(order_number))
         from orders.serializers import OrderDetailSerializer
         serializer = OrderDetailSerializer(order)
         return Response(serializer.data)
@@ -292,8 +269,37 @@ def get_order_confirmation(request, order_id):
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
 
 # ===== HELPER FUNCTIONS =====
+def cart_for_display(cart):
+    """Reload a cart with its totals and prefetched lines, so serializing it costs a fixed number of queries"""
+    if isinstance(cart, CachedCart):
+        return cart.for_display()
+    return Cart.objects.for_display().get(pk=cart.pk)
+
+def persisted_cart(cart):
+    """The database Cart for a cart, writing out a cached anonymous cart first"""
+    if isinstance(cart, CachedCart):
+        return cart.persist()
+    return cart
+
+def get_anonymous_cart(request):
+    """
+    Cache-backed cart for anonymous visitors (CART_BACKEND = 'cache').
+    
+    Browsing creates neither a session nor a Cart row; the cart is only
+    written to the database at checkout, after which the session's Cart is used.
+    """
+    cart = CachedCart.for_request(request)
+    if cart.token is None and request.session.session_key:
+        session_cart = Cart.objects.filter(session_key=request.session.session_key).first()
+        if session_cart is not None:
+            return session_cart
+    return cart
+
 def get_or_create_cart(request):
     """Get or create cart for current session/user with session handling"""
+    if not request.user.is_authenticated and settings.CART_BACKEND == 'cache':
+        return get_anonymous_cart(request)
+    
     # Ensure session exists
     if not request.session.session_key:
         request.session.create()
@@ -309,26 +315,14 @@ def get_or_create_cart(request):
                 # Migrate session cart items to user cart if needed
                 session_carts = Cart.objects.filter(session_key=session_key)
                 for session_cart in session_carts:
-                    for item in session_cart.items.all():
-                        # Check if item already exists in user cart
-                        existing_item = user_cart.items.filter(
-                            menu_item=item.menu_item,
-                            extras=item.extras,
-                            spice_level=item.spice_level,
-                            special_notes=item.special_notes
-                        ).first()
-                        
-                        if existing_item:
-                            existing_item.quantity += item.quantity
-                            existing_item.save()
-                        else:
-                            item.cart = user_cart
-                            item.save()
-                    
-                    # Delete the session cart after migration
                     if session_cart.id != user_cart.id:
+                        # One bulk upsert keyed on the line signature, then drop the session cart
+                        user_cart.merge_lines(session_cart.items.all())
                         session_cart.delete()
             
+            # Lines an anonymous visitor kept in the cache are persisted on login
+            CachedCart.for_request(request).merge_into(user_cart)
+            
             logger.info(f"Using user cart: {user_cart.id} for user: {request.user.username}")
             return user_cart
             
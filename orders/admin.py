@@ -77,7 +77,7 @@
 
 from django.contrib import admin
 from django.utils.html import format_html
-from .models import Order, OrderItem
+from .models import Order, OrderItem, parse_order_code
 
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
@@ -134,8 +134,17 @@ class OrderAdmin(admin.ModelAdmin):
         }),
     ]
     
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        # An order number ('#ABCD1234') also matches on the unique code index; OR'ed in, since
+        # a term that merely looks like one (a phone or email fragment) must still find those
+        code = parse_order_code(search_term)
+        if code is not None:
+            results |= queryset.filter(code=code)
+        return results, may_have_duplicates
+    
     def order_id_display(self, obj):
-        return f"#{obj.id.hex[:8].upper()}"
+        return f"#{obj.code}"
     order_id_display.short_description = 'ORDER ID'
     
     def items_count(self, obj):
@@ -173,7 +182,7 @@ class OrderItemAdmin(admin.ModelAdmin):
     list_filter = ['cached_item_category', 'order__status']
     search_fields = [
         'cached_item_name', 'cached_item_category', 
-        'order__customer_name', 'order__id'
+        'order__customer_name', '=order__code'
     ]
     
     # ⬅️ REMOVE this line since you don't have the template:
@@ -181,7 +190,7 @@ class OrderItemAdmin(admin.ModelAdmin):
     
     def order_item_display(self, obj):
         item_name = obj.cached_item_name or obj.menu_item.name if obj.menu_item else "Unknown Item"
-        order_short = f"#{obj.order.id.hex[:8].upper()}" if obj.order else "No Order"
+        order_short = f"#{obj.order.code}" if obj.order else "No Order"
         customer_name = obj.order.customer_name if obj.order else "Unknown Customer"
         return format_html(
             '<strong>{}</strong><br><small>Order {} - {}</small>',
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import ORDER_INDEX, ORDER_ITEM_INDEX
+        # Rebuilding a table on SQLite drops the full-text triggers; put them back after migrating
+        post_migrate.connect(ORDER_INDEX.repair, sender=self, weak=False, dispatch_uid='orders.order_index')
+        post_migrate.connect(ORDER_ITEM_INDEX.repair, sender=self, weak=False, dispatch_uid='orders.order_item_index')
@@ -0,0 +1,151 @@
+import asyncio
+import json
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.module_loading import import_string
+from rest_framework.utils.encoders import JSONEncoder
+
+
+class InProcessBroker:
+    """
+    Order events for a single server process.
+
+    Recent events are kept in a ring buffer so a reconnecting screen can resume
+    from its Last-Event-ID, and waiting streams are woken directly on publish.
+    Ids are seeded from the clock so they keep increasing across restarts.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=settings.ORDER_EVENTS_BUFFER)
+        self._last_id = time.time_ns() // 1000
+        self._waiters = set()
+
+    def last_id(self):
+        with self._lock:
+            return self._last_id
+
+    def publish(self, event_type, data):
+        with self._lock:
+            self._last_id += 1
+            event = {'id': self._last_id, 'type': event_type, 'data': data}
+            self._events.append(event)
+            waiters = list(self._waiters)
+        # Publishers run in worker threads; wake each stream on its own event loop
+        for loop, wake in waiters:
+            loop.call_soon_threadsafe(wake.set)
+        return event
+
+    def events_since(self, last_id):
+        """Return (events after last_id, complete) - complete is False if some were dropped"""
+        with self._lock:
+            events = [event for event in self._events if event['id'] > last_id]
+            oldest = self._events[0]['id'] if self._events else self._last_id + 1
+            return events, last_id >= oldest - 1
+
+    async def wait(self, last_id, timeout):
+        """Wait up to ``timeout`` seconds for events after ``last_id``"""
+        entry = (asyncio.get_running_loop(), asyncio.Event())
+        with self._lock:
+            self._waiters.add(entry)
+        try:
+            events, complete = self.events_since(last_id)
+            if not events:
+                try:
+                    await asyncio.wait_for(entry[1].wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                events, complete = self.events_since(last_id)
+            return events, complete
+        finally:
+            with self._lock:
+                self._waiters.discard(entry)
+
+
+class CacheBroker:
+    """
+    Order events shared through the Django cache, for several server processes.
+
+    Each event is stored under its own key and a counter holds the latest id;
+    streams poll the counter every ORDER_EVENTS_POLL_INTERVAL seconds. Needs a
+    cache shared by all workers (Redis, Memcached) - locmem is per process.
+    """
+    LAST_ID_KEY = 'orders:events:last'
+
+    def event_key(self, event_id):
+        return f'orders:events:{event_id}'
+
+    def last_id(self):
+        last_id = cache.get(self.LAST_ID_KEY)
+        if last_id is None:
+            cache.add(self.LAST_ID_KEY, time.time_ns() // 1000, None)
+            last_id = cache.get(self.LAST_ID_KEY)
+        return last_id
+
+    def publish(self, event_type, data):
+        self.last_id()
+        event_id = cache.incr(self.LAST_ID_KEY)
+        event = {'id': event_id, 'type': event_type, 'data': data}
+        cache.set(self.event_key(event_id), event, settings.ORDER_EVENTS_CACHE_TIMEOUT)
+        return event
+
+    def events_since(self, last_id):
+        latest = self.last_id()
+        first = max(last_id + 1, latest - settings.ORDER_EVENTS_BUFFER + 1)
+        found = cache.get_many([self.event_key(event_id) for event_id in range(first, latest + 1)])
+        events = sorted(found.values(), key=lambda event: event['id'])
+        # An id still being written by another worker shows up on the next poll
+        complete = first == last_id + 1 or last_id >= latest
+        return events, complete
+
+    async def wait(self, last_id, timeout):
+        deadline = time.monotonic() + timeout
+        while True:
+            events, complete = await asyncio.to_thread(self.events_since, last_id)
+            remaining = deadline - time.monotonic()
+            if events or not complete or remaining <= 0:
+                return events, complete
+            await asyncio.sleep(min(settings.ORDER_EVENTS_POLL_INTERVAL, remaining))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """The ORDER_EVENTS_BROKER instance for this process"""
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            _broker = import_string(settings.ORDER_EVENTS_BROKER)()
+        return _broker
+
+
+def order_event_data(order):
+    """The compact order payload pushed to screens - no queries needed"""
+    return {
+        'id': str(order.id),
+        'customer_name': order.customer_name,
+        'order_type': order.order_type,
+        'status': order.status,
+        'total_amount': str(order.total_amount),
+        'created_at': order.created_at.isoformat() if order.created_at else None,
+        'updated_at': order.updated_at.isoformat() if order.updated_at else None,
+    }
+
+
+def publish_order_event(event_type, order):
+    """Publish an event for ``order`` once the current transaction commits"""
+    data = order_event_data(order)
+    transaction.on_commit(lambda: get_broker().publish(event_type, data))
+
+
+def format_sse(event):
+    """Encode one event in the text/event-stream format"""
+    data = json.dumps(event['data'], cls=JSONEncoder)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {data}\n\n"
@@ -22,11 +22,13 @@
 #         fields = ['menu_item_category', 'order__status']
 
 import django_filters
-from .models import Order, OrderItem
+from kulan_backend.search import FullTextSearchFilter, full_text_filter
+from .models import Order, OrderItem, parse_order_code
+from .search import ORDER_INDEX, ORDER_ITEM_INDEX
 
 class OrderFilter(django_filters.FilterSet):
-    customer_name = django_filters.CharFilter(lookup_expr='icontains')
-    customer_email = django_filters.CharFilter(lookup_expr='icontains')
+    customer_name = django_filters.CharFilter(method=full_text_filter(ORDER_INDEX, 'customer_name'))
+    customer_email = django_filters.CharFilter(method=full_text_filter(ORDER_INDEX, 'customer_email'))
     status = django_filters.ChoiceFilter(choices=Order.STATUS_CHOICES)
     order_type = django_filters.ChoiceFilter(choices=Order.ORDER_TYPE_CHOICES)
     
@@ -35,11 +37,23 @@ class OrderFilter(django_filters.FilterSet):
         fields = ['status', 'order_type']
 
 class OrderItemFilter(django_filters.FilterSet):
-    menu_item_name = django_filters.CharFilter(field_name='cached_item_name', lookup_expr='icontains')
-    menu_item_category = django_filters.CharFilter(field_name='cached_item_category', lookup_expr='icontains')
-    order__customer_name = django_filters.CharFilter(lookup_expr='icontains')
+    menu_item_name = django_filters.CharFilter(method=full_text_filter(ORDER_ITEM_INDEX, 'cached_item_name'))
+    menu_item_category = django_filters.CharFilter(method=full_text_filter(ORDER_ITEM_INDEX, 'cached_item_category'))
+    order__customer_name = django_filters.CharFilter(method=full_text_filter(ORDER_INDEX, 'customer_name', 'order'))
     order__status = django_filters.ChoiceFilter(choices=Order.STATUS_CHOICES)
     
     class Meta:
         model = OrderItem
-        fields = ['cached_item_category', 'order__status']
\ No newline at end of file
+        fields = ['cached_item_category', 'order__status']
+
+class OrderNumberSearchFilter(FullTextSearchFilter):
+    """
+    Full-text ?search= that also finds an order by its number ('#ABCD1234'),
+    with a point lookup on the view's ``order_code_lookup``.
+    """
+    def filter_queryset(self, request, queryset, view):
+        matches = super().filter_queryset(request, queryset, view)
+        code = parse_order_code(request.query_params.get(self.search_param, ''))
+        if code is None:
+            return matches
+        return matches | queryset.filter(**{view.order_code_lookup: code})
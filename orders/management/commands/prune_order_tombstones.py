@@ -0,0 +1,14 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from orders.models import OrderTombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete deleted-order tombstones older than ORDER_TOMBSTONE_RETENTION_DAYS'
+    
+    def handle(self, *args, **options):
+        deleted = OrderTombstone.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f'Pruned {deleted} order tombstones older than {settings.ORDER_TOMBSTONE_RETENTION_DAYS} days'
+        ))
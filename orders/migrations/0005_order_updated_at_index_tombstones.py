@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_orderitem_custom_spice_level_orderitem_spice_notes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.UUIDField()),
+                ('deleted_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['updated_at'], name='orders_orde_updated_94e16c_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_menuitem_updated_at'),
+        ('orders', '0005_order_updated_at_index_tombstones'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderitem',
+            index=models.Index(fields=['created_at'], name='orders_orde_created_861eeb_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from kulan_backend.search import FullTextIndex
+
+# Frozen copies of orders.search.ORDER_INDEX and ORDER_ITEM_INDEX
+ORDER_INDEX = FullTextIndex(
+    'orders_order_search', 'orders.Order', 'orders_order',
+    columns={
+        'customer_name': 'customer_name',
+        'customer_email': 'customer_email',
+        'customer_phone': 'customer_phone',
+        'item_names': 'items__cached_item_name',
+    },
+    expressions={
+        'item_names': "(SELECT group_concat(cached_item_name, ' ') FROM orders_orderitem WHERE order_id = {id})",
+    },
+    refresh_on=[('orders_orderitem', 'order_id', ['cached_item_name'])],
+    integer_pk=False,
+)
+
+ORDER_ITEM_INDEX = FullTextIndex(
+    'orders_orderitem_search', 'orders.OrderItem', 'orders_orderitem',
+    columns={
+        'cached_item_name': 'cached_item_name',
+        'cached_item_category': 'cached_item_category',
+    },
+    integer_pk=False,
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0006_orderitem_orders_orde_created_861eeb_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(ORDER_INDEX.create, ORDER_INDEX.drop),
+        migrations.RunPython(ORDER_ITEM_INDEX.create, ORDER_ITEM_INDEX.drop),
+    ]
@@ -0,0 +1,67 @@
+import uuid
+
+from django.db import migrations, models
+
+from kulan_backend.search import FullTextIndex
+
+BATCH_SIZE = 2000
+
+# Frozen copy of orders.search.ORDER_INDEX (see 0007_order_search_index)
+ORDER_INDEX = FullTextIndex(
+    'orders_order_search', 'orders.Order', 'orders_order',
+    columns={
+        'customer_name': 'customer_name',
+        'customer_email': 'customer_email',
+        'customer_phone': 'customer_phone',
+        'item_names': 'items__cached_item_name',
+    },
+    expressions={
+        'item_names': "(SELECT group_concat(cached_item_name, ' ') FROM orders_orderitem WHERE order_id = {id})",
+    },
+    refresh_on=[('orders_orderitem', 'order_id', ['cached_item_name'])],
+    integer_pk=False,
+)
+
+
+def populate_codes(apps, schema_editor):
+    Order = apps.get_model('orders', 'Order')
+
+    used = set()
+    batch = []
+    # Oldest first, so if two ids share their first digits the number already handed out is kept
+    pks = Order.objects.order_by('created_at', 'pk').values_list('pk', flat=True)
+    for pk in pks.iterator(chunk_size=BATCH_SIZE):
+        code = pk.hex[:8].upper()
+        while code in used:
+            code = uuid.uuid4().hex[:8].upper()
+        used.add(code)
+        batch.append(Order(pk=pk, code=code))
+        if len(batch) == BATCH_SIZE:
+            Order.objects.bulk_update(batch, ['code'])
+            batch = []
+    Order.objects.bulk_update(batch, ['code'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0007_order_search_index'),
+    ]
+
+    operations = [
+        # Unapplying also copies the table (twice); put the triggers back once it is done
+        migrations.RunPython(migrations.RunPython.noop, ORDER_INDEX.restore_triggers),
+        migrations.AddField(
+            model_name='order',
+            name='code',
+            field=models.CharField(editable=False, max_length=8, null=True),
+        ),
+        migrations.RunPython(populate_codes, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='code',
+            field=models.CharField(editable=False, max_length=8, unique=True),
+        ),
+        # SQLite applies the AlterField by copying the table, which leaves the search triggers behind
+        migrations.RunPython(ORDER_INDEX.restore_triggers, migrations.RunPython.noop),
+    ]
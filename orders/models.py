@@ -87,9 +87,26 @@
 
 
 
-from django.db import models
+from django.conf import settings
+from django.db import IntegrityError, models, router, transaction
+from django.utils import timezone
+import re
+import secrets
 import uuid
-from django.db.models import Sum
+from datetime import timedelta
+from decimal import Decimal
+from django.db.models import Sum, F
+
+# Orders are quoted as '#ABCD1234': the first hex digits of the id, upper-cased,
+# or random hex digits for the rare order whose id prefix is already taken
+ORDER_CODE_LENGTH = 8
+ORDER_CODE_ATTEMPTS = 5
+ORDER_CODE_PATTERN = re.compile(r'#?([0-9a-fA-F]{%d})' % ORDER_CODE_LENGTH)
+
+def parse_order_code(value):
+    """Return the stored code for an order number like '#abcd1234', or None"""
+    match = ORDER_CODE_PATTERN.fullmatch(value.strip())
+    return match.group(1).upper() if match else None
 
 class Order(models.Model):
     STATUS_CHOICES = [
@@ -108,6 +125,8 @@ class Order(models.Model):
     ]
     
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # The order number staff and customers quote; unique, so looking one up is a point query
+    code = models.CharField(max_length=ORDER_CODE_LENGTH, unique=True, editable=False)
     customer_name = models.CharField(max_length=255)
     customer_email = models.EmailField()
     customer_phone = models.CharField(max_length=20, blank=True)
@@ -127,15 +146,49 @@ class Order(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['order_type']),
             models.Index(fields=['created_at']),
+            # The changes feed pages on (updated_at, id)
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
-        return f"Order #{self.id.hex[:8]} - {self.customer_name}"
+        return f"Order #{self.code} - {self.customer_name}"
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the status as loaded, so saves can tell a status change apart
+        if 'status' in field_names:
+            instance._loaded_status = instance.status
+        return instance
+    
+    def insert_with_code(self, *args, **kwargs):
+        """
+        Insert a new order under the number derived from its id.
+        
+        Should that number be taken, the insert is retried in a savepoint with
+        a random one: the id callers set or were given never changes, and two
+        concurrent inserts cannot both claim a number the unique index refuses.
+        """
+        using = kwargs.get('using') or router.db_for_write(Order, instance=self)
+        self.code = self.id.hex[:ORDER_CODE_LENGTH].upper()
+        for attempt in range(ORDER_CODE_ATTEMPTS):
+            try:
+                with transaction.atomic(using=using):
+                    super().save(*args, **kwargs)
+                return
+            except IntegrityError:
+                last_attempt = attempt == ORDER_CODE_ATTEMPTS - 1
+                if last_attempt or not Order.objects.using(using).filter(code=self.code).exists():
+                    raise
+                self.code = secrets.token_hex(ORDER_CODE_LENGTH // 2).upper()
     
     def save(self, *args, **kwargs):
         # Save first to get ID if new order
         is_new = not self.id
-        super().save(*args, **kwargs)
+        if self._state.adding and not self.code:
+            self.insert_with_code(*args, **kwargs)
+        else:
+            super().save(*args, **kwargs)
         
         # Calculate total after saving (so order items are available)
         if is_new:
@@ -143,11 +196,42 @@ class Order(models.Model):
     
     def calculate_total(self):
         """Calculate total amount from order items"""
-        total = sum(item.total_price for item in self.items.all())
+        # Summed in the database; SQLite does this in floats, so quantize back to exact cents
+        total = (self.items.aggregate(
+            total=Sum(
+                F('price_at_time') * F('quantity'),
+                output_field=models.DecimalField(max_digits=10, decimal_places=2)
+            )
+        )['total'] or Decimal('0')).quantize(Decimal('0.01'))
         self.total_amount = total
         # Use update to avoid recursion
         Order.objects.filter(id=self.id).update(total_amount=total)
         return total
+    
+    @classmethod
+    def create_with_items(cls, lines, **fields):
+        """
+        Create an order and all of its lines in a fixed number of queries.
+        
+        ``lines`` are OrderItem field dicts whose ``menu_item`` should already be
+        loaded with its category (e.g. via select_related). Lines are inserted with
+        bulk_create and the total is computed once, up front.
+        """
+        items = []
+        for line in lines:
+            item = OrderItem(**line)
+            item.fill_from_menu_item()
+            items.append(item)
+        
+        fields['total_amount'] = sum((item.total_price for item in items), Decimal('0'))
+        
+        with transaction.atomic():
+            order = cls.objects.create(**fields)
+            for item in items:
+                item.order = order
+            OrderItem.objects.bulk_create(items)
+        
+        return order
 
 class OrderItem(models.Model):
     CUSTOM_SPICE_CHOICES = [
@@ -180,19 +264,26 @@ class OrderItem(models.Model):
     
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
     
     def __str__(self):
         if self.menu_item:
-            return f"{self.quantity}x {self.menu_item.name} - Order #{self.order.id.hex[:8]}"
-        return f"{self.quantity}x Item - Order #{self.order.id.hex[:8]}"
+            return f"{self.quantity}x {self.menu_item.name} - Order #{self.order.code}"
+        return f"{self.quantity}x Item - Order #{self.order.code}"
     
-    def save(self, *args, **kwargs):
-        # Auto-populate cached fields and price when saving
+    def fill_from_menu_item(self):
+        """Auto-populate cached fields and price from the menu item"""
         if self.menu_item:
             self.cached_item_name = self.menu_item.name
             self.cached_item_category = self.menu_item.category.name
             if not self.price_at_time or self.price_at_time == 0:
                 self.price_at_time = self.menu_item.price
+    
+    def save(self, *args, **kwargs):
+        # Auto-populate cached fields and price when saving
+        self.fill_from_menu_item()
         super().save(*args, **kwargs)
         
         # Update order total after saving
@@ -205,4 +296,26 @@ class OrderItem(models.Model):
         if self.price_at_time is not None and self.quantity is not None:
             return self.price_at_time * self.quantity
         return 0
-    
\ No newline at end of file
+    
+
+class OrderTombstone(models.Model):
+    """Marks a deleted order, so the changes feed can tell synced clients to drop it"""
+    order_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    
+    class Meta:
+        # Kept for ORDER_TOMBSTONE_RETENTION_DAYS, then pruned (see prune)
+        ordering = ['deleted_at']
+    
+    def __str__(self):
+        return f"Deleted order #{self.order_id.hex[:8]}"
+    
+    @classmethod
+    def prune(cls, now=None):
+        """
+        Delete the tombstones older than ORDER_TOMBSTONE_RETENTION_DAYS; returns
+        how many. Changes-feed cursors from before then get a 410 and resync.
+        """
+        cutoff = (now or timezone.now()) - timedelta(days=settings.ORDER_TOMBSTONE_RETENTION_DAYS)
+        deleted, _ = cls.objects.filter(deleted_at__lt=cutoff).delete()
+        return deleted
@@ -0,0 +1,26 @@
+from kulan_backend.search import FullTextIndex
+
+ORDER_ITEM_NAMES = "(SELECT group_concat(cached_item_name, ' ') FROM orders_orderitem WHERE order_id = {id})"
+
+# Orders by customer and by what they ordered
+ORDER_INDEX = FullTextIndex(
+    'orders_order_search', 'orders.Order', 'orders_order',
+    columns={
+        'customer_name': 'customer_name',
+        'customer_email': 'customer_email',
+        'customer_phone': 'customer_phone',
+        'item_names': 'items__cached_item_name',
+    },
+    expressions={'item_names': ORDER_ITEM_NAMES},
+    refresh_on=[('orders_orderitem', 'order_id', ['cached_item_name'])],
+    integer_pk=False,
+)
+
+ORDER_ITEM_INDEX = FullTextIndex(
+    'orders_orderitem_search', 'orders.OrderItem', 'orders_orderitem',
+    columns={
+        'cached_item_name': 'cached_item_name',
+        'cached_item_category': 'cached_item_category',
+    },
+    integer_pk=False,
+)
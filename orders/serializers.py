@@ -113,8 +113,35 @@
 #         }
 from rest_framework import serializers
 from .models import Order, OrderItem
+from menu.models import MenuItem
 from menu.serializers import MenuItemSerializer
 
+# Number of order lines shown in the order list preview
+ORDER_ITEMS_PREVIEW = 3
+
+def menu_item_details(obj, context):
+    """
+    Serialize the menu item behind an order line.
+    
+    When the context carries a ``menu_item_memo`` dict, each distinct dish is
+    serialized once per response and reused by every line that points at it.
+    """
+    if obj.menu_item_id is None:
+        # Fallback for cached data
+        return {
+            'name': obj.cached_item_name,
+            'category': {'name': obj.cached_item_category},
+            'image': None
+        }
+    
+    memo = context.get('menu_item_memo')
+    if memo is None:
+        return MenuItemSerializer(obj.menu_item, context=context).data
+    
+    if obj.menu_item_id not in memo:
+        memo[obj.menu_item_id] = MenuItemSerializer(obj.menu_item, context=context).data
+    return memo[obj.menu_item_id]
+
 class OrderItemSerializer(serializers.ModelSerializer):
     total_price = serializers.ReadOnlyField()
     menu_item_details = serializers.SerializerMethodField()
@@ -132,17 +159,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
     
     def get_menu_item_details(self, obj):
         """Get detailed menu item information with absolute image URL"""
-        if obj.menu_item:
-            # Use MenuItemSerializer to get full details including proper image URL
-            from menu.serializers import MenuItemSerializer
-            return MenuItemSerializer(obj.menu_item, context=self.context).data
-        
-        # Fallback for cached data
-        return {
-            'name': obj.cached_item_name,
-            'category': {'name': obj.cached_item_category},
-            'image': None
-        }
+        return menu_item_details(obj, self.context)
 
 class OrderListSerializer(serializers.ModelSerializer):
     items_count = serializers.SerializerMethodField()
@@ -151,17 +168,23 @@ class OrderListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'id', 'customer_name', 'customer_email', 'customer_phone',
+            'id', 'code', 'customer_name', 'customer_email', 'customer_phone',
             'delivery_address', 'order_type', 'status', 'total_amount',
             'created_at', 'items_count', 'order_items_preview'
         ]
     
     def get_items_count(self, obj):
+        # Use the annotated item_count from the list queryset if available
+        if hasattr(obj, 'item_count'):
+            return obj.item_count
         return obj.items.count()
     
     def get_order_items_preview(self, obj):
         """Get first few items for the list view with proper image URLs"""
-        items = obj.items.all()[:3]
+        # The list queryset prefetches just the preview rows into preview_items
+        items = getattr(obj, 'preview_items', None)
+        if items is None:
+            items = obj.items.all()[:ORDER_ITEMS_PREVIEW]
         return OrderItemSerializer(items, many=True, context=self.context).data
 
 class OrderDetailSerializer(serializers.ModelSerializer):
@@ -171,7 +194,7 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
         fields = [
-            'id', 'customer_name', 'customer_email', 'customer_phone',
+            'id', 'code', 'customer_name', 'customer_email', 'customer_phone',
             'delivery_address', 'order_type', 'status', 'total_amount',
             'created_at', 'updated_at', 'items', 'items_count'
         ]
@@ -179,8 +202,12 @@ class OrderDetailSerializer(serializers.ModelSerializer):
     def get_items_count(self, obj):
         return obj.items.count()
 
+class OrderLineSerializer(OrderItemSerializer):
+    """Order line input - menu items are resolved in bulk by OrderCreateSerializer"""
+    menu_item = serializers.IntegerField(source='menu_item_id', allow_null=True, required=False)
+
 class OrderCreateSerializer(serializers.ModelSerializer):
-    items = OrderItemSerializer(many=True)
+    items = OrderLineSerializer(many=True)
     
     class Meta:
         model = Order
@@ -189,24 +216,24 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             'delivery_address', 'order_type', 'items'
         ]
     
-    def create(self, validated_data):
-        items_data = validated_data.pop('items')
-        order = Order.objects.create(**validated_data)
+    def validate_items(self, items):
+        """Load every referenced menu item (with its category) in one query"""
+        menu_item_ids = {item['menu_item_id'] for item in items if item.get('menu_item_id') is not None}
+        menu_items = MenuItem.objects.select_related('category').in_bulk(menu_item_ids)
         
-        # Create order items with proper menu_item relationship
-        for item_data in items_data:
-            # Extract menu_item from the data
-            menu_item = item_data.pop('menu_item')
-            OrderItem.objects.create(
-                order=order, 
-                menu_item=menu_item,
-                **item_data
+        missing = sorted(menu_item_ids - set(menu_items))
+        if missing:
+            raise serializers.ValidationError(
+                f'Invalid pk "{missing[0]}" - object does not exist.'
             )
         
-        # Calculate total
-        order.calculate_total()
-        
-        return order
+        for item in items:
+            item['menu_item'] = menu_items.get(item.pop('menu_item_id', None))
+        return items
+    
+    def create(self, validated_data):
+        items_data = validated_data.pop('items')
+        return Order.create_with_items(items_data, **validated_data)
 
 class OrderItemDetailSerializer(serializers.ModelSerializer):
     order_info = serializers.SerializerMethodField()
@@ -224,21 +251,11 @@ class OrderItemDetailSerializer(serializers.ModelSerializer):
     
     def get_order_info(self, obj):
         return {
-            'id': obj.order.id.hex[:8] if obj.order else None,
+            'id': obj.order.code if obj.order else None,
             'customer_name': obj.order.customer_name if obj.order else 'Unknown',
             'total_amount': float(obj.order.total_amount) if obj.order and obj.order.total_amount else 0.0,
             'status': obj.order.status if obj.order else 'unknown'
         }
     
     def get_menu_item_details(self, obj):
-        if obj.menu_item:
-            # Use MenuItemSerializer to get full details including proper image URL
-            from menu.serializers import MenuItemSerializer
-            return MenuItemSerializer(obj.menu_item, context=self.context).data
-        
-        # Fallback for cached data
-        return {
-            'name': obj.cached_item_name,
-            'category': {'name': obj.cached_item_category},
-            'image': None
-        }
\ No newline at end of file
+        return menu_item_details(obj, self.context)
\ No newline at end of file
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .events import publish_order_event
+from .models import Order, OrderItem, OrderTombstone
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if created:
+        publish_order_event('order.created', instance)
+    elif instance.status != getattr(instance, '_loaded_status', instance.status):
+        publish_order_event('order.status', instance)
+    instance._loaded_status = instance.status
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    OrderTombstone.objects.create(order_id=instance.pk)
+    # Deletions are what grow the history, so they also trim it - no scheduler needed
+    OrderTombstone.prune()
+
+
+@receiver(post_save, sender=OrderItem)
+@receiver(post_delete, sender=OrderItem)
+def order_item_changed(sender, instance, **kwargs):
+    # Lines are synced as part of their order, so move the order's change stamp too.
+    # update() skips post_save; on a cascade delete the order is already gone.
+    Order.objects.filter(pk=instance.order_id).update(updated_at=timezone.now())
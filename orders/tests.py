@@ -1,3 +1,453 @@
+import json
+import uuid
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.sql import emit_post_migrate_signal
+from django.db import connection
 from django.test import TestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from menu.models import ExtraTopping
+from menu.testing import make_menu_item
+from users.models import CustomUser
+from .events import get_broker
+from .models import Order, OrderItem, OrderTombstone
+from .search import ORDER_INDEX
+from .views import order_stats
+
+
+class OrderListQueryCountTests(TestCase):
+    """The order list must cost a fixed number of queries per page"""
+
+    # Pagination count + orders with item_count + preview lines + menu items + toppings
+    LIST_QUERIES = 5
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        topping = ExtraTopping.objects.create(name='Cheese', price='1.00')
+        self.dishes = [make_menu_item(f'Dish {i}') for i in range(4)]
+        for dish in self.dishes:
+            dish.extra_toppings.add(topping)
+
+    def add_orders(self, count, lines):
+        for i in range(count):
+            order = Order.objects.create(customer_name=f'Customer {i}', customer_email=f'c{i}@example.com')
+            for line in range(lines):
+                OrderItem.objects.create(order=order, menu_item=self.dishes[line % len(self.dishes)])
+
+    def test_list_query_count_is_fixed(self):
+        self.add_orders(2, 1)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            self.client.get('/api/orders/orders/')
+
+        self.add_orders(20, 6)
+        with self.assertNumQueries(self.LIST_QUERIES):
+            response = self.client.get('/api/orders/orders/')
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), 20)
+        self.assertEqual(results[0]['items_count'], 6)
+        self.assertEqual(len(results[0]['order_items_preview']), 3)
+
+    def test_cursor_pages_skip_count(self):
+        self.add_orders(25, 2)
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            response = self.client.get('/api/orders/orders/', {'cursor': ''})
+        page = response.json()
+        self.assertNotIn('count', page)
+        seen = [order['id'] for order in page['results']]
+
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            page = self.client.get(page['next']).json()
+        seen += [order['id'] for order in page['results']]
+        self.assertIsNone(page['next'])
+        self.assertEqual(len(set(seen)), 25)
+
+    def test_page_numbers_without_count(self):
+        self.add_orders(25, 1)
+        with self.assertNumQueries(self.LIST_QUERIES - 1):
+            page = self.client.get('/api/orders/orders/', {'count': 'false', 'page': 2}).json()
+        self.assertNotIn('count', page)
+        self.assertEqual(len(page['results']), 5)
+        self.assertIsNone(page['next'])
+        self.assertIn('count=false', page['previous'])
+
+
+class OrderEventsTests(TestCase):
+    """The order feed replays what a screen missed since its Last-Event-ID"""
+
+    def test_resume_from_last_event_id(self):
+        last_id = get_broker().last_id()
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(customer_name='Kitchen', customer_email='k@example.com')
+        order = Order.objects.get(pk=order.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'preparing'
+            order.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            order.customer_phone = '0700000000'
+            order.save()
+
+        response = self.client.get('/api/orders/events/', HTTP_LAST_EVENT_ID=str(last_id))
+        body = response.content.decode()
+
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(body.count('event: order.created'), 1)
+        self.assertEqual(body.count('event: order.status'), 1)
+        self.assertIn('"status": "preparing"', body)
+
+
+class OrderChangesTests(TestCase):
+    """?since= returns only what changed after the cursor, deletions included"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.dish = make_menu_item('Dish')
+
+    def sync(self, cursor, **params):
+        response = self.client.get('/api/orders/orders/', {'since': cursor, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_changes_since_cursor(self):
+        kept, changed, removed = [
+            Order.objects.create(customer_name=name, customer_email=f'{name}@example.com')
+            for name in ('kept', 'changed', 'removed')
+        ]
+        first = self.sync('')
+        self.assertEqual([order['customer_name'] for order in first['changes']], ['kept', 'changed', 'removed'])
+        self.assertFalse(first['has_more'])
+
+        OrderItem.objects.create(order=changed, menu_item=self.dish, quantity=2)
+        removed_id = str(removed.id)
+        removed.delete()
+        second = self.sync(first['cursor'])
+
+        self.assertEqual([order['id'] for order in second['changes']], [str(changed.id)])
+        self.assertEqual(len(second['changes'][0]['items']), 1)
+        self.assertEqual([tombstone['id'] for tombstone in second['deleted']], [removed_id])
+        self.assertEqual(self.sync(second['cursor']), {
+            'changes': [], 'deleted': [], 'cursor': second['cursor'], 'has_more': False
+        })
+
+    def test_changes_are_paged(self):
+        for i in range(5):
+            Order.objects.create(customer_name=f'Customer {i}', customer_email=f'c{i}@example.com')
+        page = self.sync('', limit=2)
+        seen = [order['customer_name'] for order in page['changes']]
+        while page['has_more']:
+            page = self.sync(page['cursor'], limit=2)
+            seen += [order['customer_name'] for order in page['changes']]
+        self.assertEqual(seen, [f'Customer {i}' for i in range(5)])
+
+    def test_pages_split_rows_sharing_a_timestamp(self):
+        moment = timezone.now()
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            orders = [
+                Order.objects.create(customer_name=f'Customer {i}', customer_email=f'c{i}@example.com')
+                for i in range(5)
+            ]
+            removed = sorted(str(order.id) for order in orders[:2])
+            for order in orders[:2]:
+                order.delete()
+        page = self.sync('', limit=2)
+        seen = [order['id'] for order in page['changes']]
+        deleted = [tombstone['id'] for tombstone in page['deleted']]
+        while page['has_more']:
+            page = self.sync(page['cursor'], limit=2)
+            seen += [order['id'] for order in page['changes']]
+            deleted += [tombstone['id'] for tombstone in page['deleted']]
+        self.assertEqual(seen, sorted(str(order.id) for order in orders[2:]))
+        self.assertEqual(sorted(deleted), removed)
+
+    def test_list_filters_apply(self):
+        Order.objects.create(customer_name='pickup', customer_email='p@example.com', order_type='pickup')
+        Order.objects.create(customer_name='delivery', customer_email='d@example.com')
+        changes = self.sync('', order_type='pickup')['changes']
+        self.assertEqual([order['customer_name'] for order in changes], ['pickup'])
+
+    def test_invalid_cursor(self):
+        for cursor in ('yesterday', f'{timezone.now().isoformat()},order,nope'):
+            response = self.client.get('/api/orders/orders/', {'since': cursor})
+            self.assertEqual(response.status_code, 400)
+
+    def test_cursor_without_offset_is_local_time(self):
+        order = Order.objects.create(customer_name='kept', customer_email='kept@example.com')
+        before = timezone.localtime(order.updated_at - timedelta(minutes=1)).replace(tzinfo=None)
+        for cursor in (before.isoformat(), before.isoformat(' ')):
+            changes = self.sync(cursor)['changes']
+            self.assertEqual([change['customer_name'] for change in changes], ['kept'])
+        self.assertEqual(self.client.get('/api/orders/orders/', {'since': '2026-13-01T10:00:00'}).status_code, 400)
+
+    def test_cursor_older_than_tombstones_is_gone(self):
+        cursor = (timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_RETENTION_DAYS + 1)).isoformat()
+        response = self.client.get('/api/orders/orders/', {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+
+    def test_old_tombstones_are_pruned(self):
+        old = OrderTombstone.objects.create(order_id=uuid.uuid4())
+        OrderTombstone.objects.filter(pk=old.pk).update(
+            deleted_at=timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_RETENTION_DAYS + 1)
+        )
+        recent = OrderTombstone.objects.create(order_id=uuid.uuid4())
+
+        out = StringIO()
+        call_command('prune_order_tombstones', stdout=out)
+        self.assertIn('Pruned 1 order tombstones', out.getvalue())
+        self.assertEqual(list(OrderTombstone.objects.values_list('pk', flat=True)), [recent.pk])
+
+        # Deleting an order prunes too, so the history stays bounded without a scheduler
+        OrderTombstone.objects.update(
+            deleted_at=timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_RETENTION_DAYS + 1)
+        )
+        order = Order.objects.create(customer_name='gone', customer_email='gone@example.com')
+        order_id = order.id
+        order.delete()
+        self.assertEqual(list(OrderTombstone.objects.values_list('order_id', flat=True)), [order_id])
+
+
+class OrderSearchTests(TestCase):
+    """?search= reads the full-text index, which triggers keep in step with the tables"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.pizza = make_menu_item('Margherita Pizza')
+        self.curry = make_menu_item('Lamb Curry')
+        self.alice = Order.objects.create(customer_name='Alice Smith', customer_email='alice@example.com')
+        self.bob = Order.objects.create(customer_name='Bob Jones', customer_email='bob@example.com')
+        OrderItem.objects.create(order=self.alice, menu_item=self.pizza)
+        OrderItem.objects.create(order=self.bob, menu_item=self.curry)
+
+    def search(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def test_order_search_follows_updates_and_deletes(self):
+        results = self.search('/api/orders/orders/', search='SMITH')
+        self.assertEqual([order['id'] for order in results], [str(self.alice.id)])
+
+        self.alice.customer_name = 'Alice Brown'
+        self.alice.save()
+        self.assertEqual(self.search('/api/orders/orders/', search='smith'), [])
+        self.assertEqual(len(self.search('/api/orders/orders/', search='brown')), 1)
+
+        self.bob.delete()
+        self.assertEqual(self.search('/api/orders/orders/', customer_email='bob@'), [])
+
+    def test_items_match_on_item_or_customer(self):
+        results = self.search('/api/orders/order-items/', search='curry')
+        self.assertEqual([item['cached_item_name'] for item in results], ['Lamb Curry'])
+        results = self.search('/api/orders/order-items/', search='alice')
+        self.assertEqual([item['cached_item_name'] for item in results], ['Margherita Pizza'])
+        self.assertEqual(results[0]['order_info']['id'], self.alice.code)
+        # Every term has to match somewhere
+        self.assertEqual(self.search('/api/orders/order-items/', search='alice curry'), [])
+
+    def grouped(self, search):
+        response = self.client.get('/api/orders/order-items/grouped_by_order/', {'search': search})
+        self.assertEqual(response.status_code, 200)
+        results = json.loads(b''.join(response.streaming_content))['results']
+        return sorted(group['order']['customer_name'] for group in results)
+
+    def test_grouped_orders_match_item_names(self):
+        OrderItem.objects.create(order=self.bob, menu_item=self.pizza)
+        self.assertEqual(self.grouped('pizza'), ['Alice Smith', 'Bob Jones'])
+
+        OrderItem.objects.filter(order=self.bob, menu_item=self.pizza).delete()
+        self.assertEqual(self.grouped('pizza'), ['Alice Smith'])
+        self.assertEqual(self.grouped('jones'), ['Bob Jones'])
+
+    def test_post_migrate_restores_dropped_triggers(self):
+        # What a table rebuild does to the index: the triggers vanish and writes go unseen
+        with connection.cursor() as cursor:
+            for statement in ORDER_INDEX.drop_trigger_sql():
+                cursor.execute(statement)
+        self.bob.customer_name = 'Bob Carter'
+        self.bob.save()
+        self.assertEqual(ORDER_INDEX.missing_triggers(connection), ORDER_INDEX.trigger_names())
+
+        emit_post_migrate_signal(verbosity=0, interactive=False, db=connection.alias)
+
+        self.assertEqual(ORDER_INDEX.missing_triggers(connection), [])
+        self.assertEqual(len(self.search('/api/orders/orders/', search='carter')), 1)
+        self.assertEqual(self.search('/api/orders/orders/', search='jones'), [])
+        OrderItem.objects.create(order=self.bob, menu_item=self.pizza)
+        self.assertEqual(self.grouped('pizza'), ['Alice Smith', 'Bob Carter'])
+
+
+class OrderNumberTests(TestCase):
+    """Orders are found by their '#ABCD1234' number through the stored code"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.order = Order.objects.create(customer_name='Alice Smith', customer_email='alice@example.com')
+        Order.objects.create(customer_name='Bob Jones', customer_email='bob@example.com')
+
+    def test_code_is_stored_from_the_id(self):
+        self.assertEqual(self.order.code, self.order.id.hex[:8].upper())
+        self.assertEqual(Order.objects.get(code=self.order.code), self.order)
+
+    def test_taken_code_keeps_the_given_id(self):
+        # An id whose first eight hex digits are already another order's number
+        given = uuid.UUID(self.order.id.hex[:8] + '0' * 24)
+        order = Order.objects.create(id=given, customer_name='Carol', customer_email='carol@example.com')
+        self.assertEqual(order.id, given)
+        self.assertNotEqual(order.code, self.order.code)
+        self.assertEqual(Order.objects.get(code=order.code).id, given)
+
+    def test_detail_search_and_confirmation_accept_the_number(self):
+        number = f'#{self.order.code.lower()}'
+        response = self.client.get(f'/api/orders/orders/%23{self.order.code}/')
+        self.assertEqual(response.json()['id'], str(self.order.id))
+
+        response = self.client.get('/api/orders/orders/', {'search': number})
+        self.assertEqual([order['code'] for order in response.json()['results']], [self.order.code])
+
+        response = self.client.get(f'/api/orderprocess/confirmation/{self.order.code}/')
+        self.assertEqual(response.json()['id'], str(self.order.id))
+        response = self.client.get('/api/orderprocess/confirmation/NOTACODE/')
+        self.assertEqual(response.status_code, 404)
+
+    def test_admin_search_adds_the_number_to_field_matches(self):
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(admin)
+        # An 8-hex term that is a phone fragment, not an order number
+        Order.objects.create(customer_name='Carol', customer_email='carol@example.com', customer_phone='+1 deadbeef 1')
+
+        def admin_search(term):
+            response = self.client.get('/admin/orders/order/', {'q': term})
+            self.assertEqual(response.status_code, 200)
+            return sorted(order.customer_name for order in response.context['cl'].result_list)
+
+        self.assertEqual(admin_search('deadbeef'), ['Carol'])
+        self.assertEqual(admin_search(f'#{self.order.code}'), ['Alice Smith'])
+        self.assertEqual(admin_search('bob'), ['Bob Jones'])
+
+
+class GroupedByOrderTests(TestCase):
+    """grouped_by_order streams one cursor page of {order, items} groups"""
+
+    def setUp(self):
+        self.client = APIClient()
+        dish = make_menu_item('Dish')
+        self.orders = []
+        for i in range(5):
+            order = Order.objects.create(customer_name=f'Customer {i}', customer_email=f'c{i}@example.com')
+            OrderItem.objects.create(order=order, menu_item=dish, quantity=i + 1)
+            self.orders.append(order)
+        # Orders without lines are left out
+        Order.objects.create(customer_name='Empty', customer_email='empty@example.com')
+
+    def get_page(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_pages_follow_the_cursor(self):
+        page = self.get_page('/api/orders/order-items/grouped_by_order/', {'page_size': 2})
+        self.assertEqual(set(page), {'next', 'previous', 'results'})
+        self.assertIsNone(page['previous'])
+
+        seen = []
+        while True:
+            seen += [group['order']['customer_name'] for group in page['results']]
+            for group in page['results']:
+                self.assertEqual(len(group['items']), 1)
+            if not page['next']:
+                break
+            page = self.get_page(page['next'])
+        self.assertEqual(seen, [f'Customer {i}' for i in reversed(range(5))])
+
+    def test_group_shape(self):
+        group = self.get_page('/api/orders/order-items/grouped_by_order/')['results'][0]
+        order = self.orders[-1]
+        self.assertEqual(group['order'], {
+            'id': order.code,
+            'customer_name': order.customer_name,
+            'total_amount': 49.95,
+            'status': 'pending',
+        })
+        self.assertEqual(group['items'][0]['quantity'], 5)
+
+
+class CreateOrderTests(TestCase):
+    """Orders and their lines are created together, with the total computed up front"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.stew = make_menu_item('Lamb Stew', price=Decimal('12.50'))
+        self.tea = make_menu_item('Spiced Tea', price=Decimal('3.25'))
+
+    def test_create_with_items_totals(self):
+        order = Order.create_with_items(
+            [{'menu_item': self.stew, 'quantity': 2}, {'menu_item': self.tea, 'quantity': 3, 'price_at_time': Decimal('3.00')}],
+            customer_name='Alice', customer_email='alice@example.com',
+        )
+        order.refresh_from_db()
+        self.assertEqual(str(order.total_amount), '34.00')
+        lines = {item.cached_item_name: item for item in order.items.all()}
+        self.assertEqual(str(lines['Lamb Stew'].price_at_time), '12.50')
+        self.assertEqual(lines['Spiced Tea'].cached_item_category, 'Lunch')
+
+    def test_create_endpoint(self):
+        user = CustomUser.objects.create_user(username='staff', email='staff@example.com', password='x')
+        self.client.force_authenticate(user)
+        payload = {
+            'customer_name': 'Alice', 'customer_email': 'alice@example.com', 'order_type': 'pickup',
+            'items': [{'menu_item': self.stew.pk, 'quantity': 2}],
+        }
+        response = self.client.post('/api/orders/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(str(Order.objects.get().total_amount), '25.00')
+
+        payload['items'] = [{'menu_item': self.stew.pk}, {'menu_item': 999999}]
+        response = self.client.post('/api/orders/orders/', payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('items', response.json())
+        self.assertEqual(Order.objects.count(), 1)
+
+
+class OrderStatsTests(TestCase):
+    """Dashboard stats come from one aggregate query, cached per minute"""
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.now = timezone.localtime()
+        Order.objects.create(customer_name='A', customer_email='a@example.com', total_amount='10.00')
+        Order.objects.create(customer_name='B', customer_email='b@example.com', total_amount='5.50',
+                             status='preparing', order_type='pickup')
+        yesterday = Order.objects.create(customer_name='C', customer_email='c@example.com', total_amount='99.00')
+        Order.objects.filter(pk=yesterday.pk).update(created_at=self.now - timedelta(days=1))
+
+    def test_stats_figures(self):
+        with self.assertNumQueries(1):
+            stats = order_stats(self.now)
+        self.assertEqual(stats['total_orders'], 3)
+        self.assertEqual(stats['today_orders'], 2)
+        self.assertEqual(stats['pending_orders'], 2)
+        self.assertEqual(stats['preparing_orders'], 1)
+        self.assertEqual(stats['revenue_today'], Decimal('15.50'))
+        self.assertEqual(stats['type_distribution'], [
+            {'order_type': 'delivery', 'count': 2}, {'order_type': 'pickup', 'count': 1}
+        ])
 
-# Create your tests here.
+    def test_endpoint_serves_the_cached_snapshot(self):
+        with mock.patch('orders.views.timezone.localtime', return_value=self.now):
+            first = self.client.get('/api/orders/orders/stats/').json()
+            Order.objects.create(customer_name='D', customer_email='d@example.com')
+            with self.assertNumQueries(0):
+                second = self.client.get('/api/orders/orders/stats/').json()
+        self.assertEqual(first, second)
+        self.assertEqual(second['total_orders'], 3)
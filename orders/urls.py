@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import OrderViewSet, OrderItemViewSet
+from .views import OrderViewSet, OrderItemViewSet, order_events
 
 router = DefaultRouter()
 router.register(r'orders', OrderViewSet, basename='orders')
@@ -10,4 +10,5 @@ app_name = 'orders'
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/', order_events, name='order-events'),
 ]
\ No newline at end of file
@@ -143,25 +143,133 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from django.db.models import Count, Q, Sum
+from rest_framework.filters import OrderingFilter
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+from django.db.models import Count, Q, Sum, Prefetch, Exists, OuterRef
+from django.conf import settings
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, StreamingHttpResponse
+from django.shortcuts import get_object_or_404
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_GET
 from datetime import timedelta
+import asyncio
+import json
+import time
+import uuid
 
-from .models import Order, OrderItem
+from menu.models import MenuItem
+from menu.serializers import requested_menu_fields, sparse_menu_queryset
+from kulan_backend.pagination import KeysetPagination
+from kulan_backend.search import search_queryset
+from .models import Order, OrderItem, OrderTombstone, parse_order_code
+from .search import ORDER_INDEX, ORDER_ITEM_INDEX
 from .serializers import (
     OrderListSerializer, OrderDetailSerializer, OrderCreateSerializer,
-    OrderItemDetailSerializer, OrderItemSerializer
+    OrderItemDetailSerializer, OrderItemSerializer, ORDER_ITEMS_PREVIEW
 )
-from .filters import OrderFilter, OrderItemFilter
+from .filters import OrderFilter, OrderItemFilter, OrderNumberSearchFilter
+from .events import format_sse, get_broker
+
+# Entries per page of the ?since= changes feed
+ORDER_CHANGES_LIMIT = 200
+ORDER_CHANGES_MAX_LIMIT = 500
+# Changes-feed entry kinds, in the order they sort within one timestamp
+CHANGED, DELETED = 0, 1
+
+def parse_changes_cursor(value):
+    """
+    ``(timestamp, kind, id)`` from a ``?since=`` cursor, or None to start over.
+    
+    A bare timestamp (cursors from before ids were added) resumes after
+    everything stamped at that moment. Raises ValueError when malformed.
+    """
+    if value in ('', '0'):
+        return None
+    # A literal '+' in the offset arrives as a space when left unencoded
+    moment, _, rest = value.replace(' ', '+').partition(',')
+    moment = parse_datetime(moment)
+    if moment is None:
+        raise ValueError(value)
+    if timezone.is_naive(moment):
+        # Cursors are issued with an offset; one typed without it is read in the server's time zone
+        moment = timezone.make_aware(moment)
+    if not rest:
+        return moment, DELETED, None
+    kind, _, key = rest.partition(',')
+    if kind == 'order':
+        return moment, CHANGED, uuid.UUID(key)
+    if kind == 'deleted':
+        return moment, DELETED, int(key)
+    raise ValueError(value)
+
+def format_changes_cursor(cursor):
+    if cursor is None:
+        return ''
+    moment, kind, key = cursor
+    if key is None:
+        return moment.isoformat()
+    return f"{moment.isoformat()},{'order' if kind == CHANGED else 'deleted'},{key}"
+
+def order_stats(now):
+    """Dashboard counters in a single conditional-aggregation query"""
+    # A half-open range on created_at can use its index, unlike created_at__date
+    today_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    today = Q(created_at__gte=today_start, created_at__lt=today_start + timedelta(days=1))
+    
+    aggregates = {
+        'total_orders': Count('id'),
+        'today_orders': Count('id', filter=today),
+        'revenue_today': Sum('total_amount', filter=today),
+    }
+    for value, _ in Order.STATUS_CHOICES:
+        aggregates[f'status_{value}'] = Count('id', filter=Q(status=value))
+    for value, _ in Order.ORDER_TYPE_CHOICES:
+        aggregates[f'type_{value}'] = Count('id', filter=Q(order_type=value))
+    
+    totals = Order.objects.order_by().aggregate(**aggregates)
+    
+    return {
+        'total_orders': totals['total_orders'],
+        'today_orders': totals['today_orders'],
+        'pending_orders': totals['status_pending'],
+        'preparing_orders': totals['status_preparing'],
+        'ready_orders': totals['status_ready'],
+        'revenue_today': totals['revenue_today'] or 0,
+        'status_distribution': [
+            {'status': value, 'count': totals[f'status_{value}']}
+            for value, _ in Order.STATUS_CHOICES if totals[f'status_{value}']
+        ],
+        'type_distribution': [
+            {'order_type': value, 'count': totals[f'type_{value}']}
+            for value, _ in Order.ORDER_TYPE_CHOICES if totals[f'type_{value}']
+        ],
+    }
+
+def embedded_menu_fields(request):
+    """Sparse fieldset for embedded menu_item_details - only ?view=compact applies here"""
+    return requested_menu_fields(request, allow_fields=False)
+
+def menu_item_queryset(request):
+    """Menu items backing menu_item_details, trimmed to the requested fields"""
+    queryset = MenuItem.objects.select_related('category').prefetch_related('extra_toppings')
+    return sparse_menu_queryset(queryset, embedded_menu_fields(request))
 
 class OrderViewSet(viewsets.ModelViewSet):
-    queryset = Order.objects.prefetch_related('items', 'items__menu_item').all()
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    queryset = Order.objects.all()
+    filter_backends = [DjangoFilterBackend, OrderNumberSearchFilter, OrderingFilter]
     filterset_class = OrderFilter
     search_fields = ['customer_name', 'customer_email', 'customer_phone']
+    # ?search= is answered from the full-text index, over the same fields
+    search_indexes = {'pk': (ORDER_INDEX, ['customer_name', 'customer_email', 'customer_phone'])}
+    order_code_lookup = 'code'
     ordering_fields = ['created_at', 'total_amount', 'status']
     ordering = ['-created_at']
+    # ?cursor= pages along the created_at index, the id breaking ties
+    cursor_ordering = ['-created_at', '-id']
     
     def get_serializer_class(self):
         if self.action == 'create':
@@ -174,18 +282,112 @@ class OrderViewSet(viewsets.ModelViewSet):
         """Pass request context to serializer for absolute URL generation"""
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['menu_fields'] = embedded_menu_fields(self.request)
+        # Request-scoped: each distinct menu item is serialized once per response
+        context['menu_item_memo'] = {}
         return context
     
     def get_queryset(self):
         queryset = super().get_queryset()
         
-        # Remove the slice - let pagination handle limiting
+        # Let pagination handle limiting - the prefetches only load the current page
         if self.action == 'list':
-            queryset = queryset.prefetch_related('items__menu_item')
-            # If you need to limit results, use pagination instead of slicing
+            # Count in SQL and fetch only the preview lines, via one windowed prefetch
+            preview_items = OrderItem.objects.prefetch_related(
+                Prefetch('menu_item', queryset=menu_item_queryset(self.request))
+            )[:ORDER_ITEMS_PREVIEW]
+            queryset = queryset.annotate(item_count=Count('items')).prefetch_related(
+                Prefetch('items', queryset=preview_items, to_attr='preview_items')
+            )
+        else:
+            queryset = queryset.prefetch_related(
+                'items',
+                Prefetch('items__menu_item', queryset=menu_item_queryset(self.request))
+            )
         
         return queryset
     
+    def get_object(self):
+        # /orders/ABCD1234/ (or %23ABCD1234) looks the order up by number on its unique index
+        code = parse_order_code(self.kwargs[self.lookup_url_kwarg or self.lookup_field])
+        if code is None:
+            return super().get_object()
+        order = get_object_or_404(self.filter_queryset(self.get_queryset()), code=code)
+        self.check_object_permissions(self.request, order)
+        return order
+    
+    def list(self, request, *args, **kwargs):
+        if 'since' in request.query_params:
+            return self.changes(request)
+        return super().list(request, *args, **kwargs)
+    
+    def changes(self, request):
+        """
+        Incremental sync: orders (with their items) changed after ``?since=``
+        plus tombstones of deleted orders, oldest first, and the cursor to send
+        next time. An empty ``since`` starts from the beginning.
+        
+        The list filters apply to the changed orders; tombstones carry no order
+        fields, so every deletion is reported. Cursors older than the tombstone
+        retention get a 410: the client has to resync from scratch.
+        """
+        try:
+            since = parse_changes_cursor(request.query_params.get('since', ''))
+        except ValueError:
+            return Response(
+                {'error': 'since must be a cursor returned by a previous sync'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if since is not None and since[0] < timezone.now() - timedelta(days=settings.ORDER_TOMBSTONE_RETENTION_DAYS):
+            return Response(
+                {'error': 'since is older than the deletion history; sync again from since='},
+                status=status.HTTP_410_GONE
+            )
+        try:
+            limit = min(max(int(request.query_params.get('limit', ORDER_CHANGES_LIMIT)), 1), ORDER_CHANGES_MAX_LIMIT)
+        except ValueError:
+            limit = ORDER_CHANGES_LIMIT
+        
+        # Both walk a (timestamp, id) index from the cursor
+        orders = self.filter_queryset(Order.objects.all()).order_by('updated_at', 'id').prefetch_related(
+            'items',
+            Prefetch('items__menu_item', queryset=menu_item_queryset(request))
+        )
+        tombstones = OrderTombstone.objects.order_by('deleted_at', 'id')
+        if since is not None:
+            moment, kind, key = since
+            if kind == CHANGED:
+                orders = orders.filter(Q(updated_at__gt=moment) | Q(updated_at=moment, id__gt=key))
+                tombstones = tombstones.filter(deleted_at__gte=moment)
+            elif key is None:
+                orders = orders.filter(updated_at__gt=moment)
+                tombstones = tombstones.filter(deleted_at__gt=moment)
+            else:
+                orders = orders.filter(updated_at__gt=moment)
+                tombstones = tombstones.filter(Q(deleted_at__gt=moment) | Q(deleted_at=moment, id__gt=key))
+        
+        # Entries sort on (timestamp, kind, id); the cursor is the last entry's key,
+        # so rows sharing a timestamp are split across pages without being skipped
+        entries = sorted(
+            [((order.updated_at, CHANGED, order.id), order) for order in orders[:limit + 1]] +
+            [((tombstone.deleted_at, DELETED, tombstone.id), tombstone) for tombstone in tombstones[:limit + 1]],
+            key=lambda entry: entry[0]
+        )
+        has_more = len(entries) > limit
+        page = entries[:limit]
+        
+        cursor = page[-1][0] if page else since
+        changed = [entry for _, entry in page if isinstance(entry, Order)]
+        return Response({
+            'changes': OrderDetailSerializer(changed, many=True, context=self.get_serializer_context()).data,
+            'deleted': [
+                {'id': entry.order_id, 'deleted_at': entry.deleted_at}
+                for _, entry in page if isinstance(entry, OrderTombstone)
+            ],
+            'cursor': format_changes_cursor(cursor),
+            'has_more': has_more,
+        })
+    
     @action(detail=True, methods=['post'])
     def update_status(self, request, pk=None):
         """Update order status"""
@@ -207,48 +409,44 @@ class OrderViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'])
     def stats(self, request):
         """Get order statistics for dashboard"""
-        today = timezone.now().date()
-        week_ago = today - timedelta(days=7)
-        
-        stats = {
-            'total_orders': Order.objects.count(),
-            'today_orders': Order.objects.filter(created_at__date=today).count(),
-            'pending_orders': Order.objects.filter(status='pending').count(),
-            'preparing_orders': Order.objects.filter(status='preparing').count(),
-            'ready_orders': Order.objects.filter(status='ready').count(),
-            'revenue_today': Order.objects.filter(
-                created_at__date=today
-            ).aggregate(total_revenue=Sum('total_amount'))['total_revenue'] or 0,
-            'status_distribution': list(Order.objects.values('status').annotate(
-                count=Count('id')
-            )),
-            'type_distribution': list(Order.objects.values('order_type').annotate(
-                count=Count('id')
-            )),
-        }
+        # Dashboards poll every few seconds - serve everyone the same per-minute snapshot
+        now = timezone.localtime()
+        cache_key = f"orders:stats:{now:%Y%m%d%H%M}"
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = order_stats(now)
+            cache.set(cache_key, stats, settings.ORDER_STATS_CACHE_TIMEOUT)
         
         return Response(stats)
 
 class OrderItemViewSet(viewsets.ModelViewSet):
-    queryset = OrderItem.objects.select_related('order', 'menu_item').all()
+    queryset = OrderItem.objects.select_related('order').all()
     serializer_class = OrderItemDetailSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, OrderNumberSearchFilter, OrderingFilter]
     filterset_class = OrderItemFilter
     search_fields = [
         'cached_item_name', 'cached_item_category', 
         'order__customer_name', 'menu_item__name'
     ]
+    search_indexes = {'pk': ORDER_ITEM_INDEX, 'order': (ORDER_INDEX, ['customer_name'])}
+    order_code_lookup = 'order__code'
     ordering_fields = ['created_at', 'price_at_time', 'quantity']
     ordering = ['-created_at']
+    cursor_ordering = ['-created_at', '-id']
     
     def get_serializer_context(self):
         """Pass request context to serializer for absolute URL generation"""
         context = super().get_serializer_context()
         context['request'] = self.request
+        context['menu_fields'] = embedded_menu_fields(self.request)
+        # Request-scoped: each distinct menu item is serialized once per response
+        context['menu_item_memo'] = {}
         return context
     
     def get_queryset(self):
-        queryset = super().get_queryset()
+        queryset = super().get_queryset().prefetch_related(
+            Prefetch('menu_item', queryset=menu_item_queryset(self.request))
+        )
         
         order_id = self.request.query_params.get('order_id')
         if order_id:
@@ -258,8 +456,14 @@ class OrderItemViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def grouped_by_order(self, request):
-        """Get order items grouped by order"""
-        orders = Order.objects.prefetch_related('items__menu_item').all()
+        """Get order items grouped by order, one cursor-paginated page streamed as JSON"""
+        # Orders without items are filtered out in SQL instead of per-order exists() checks
+        orders = Order.objects.filter(
+            Exists(OrderItem.objects.filter(order=OuterRef('pk')))
+        ).prefetch_related(
+            'items',
+            Prefetch('items__menu_item', queryset=menu_item_queryset(request))
+        )
         
         status_filter = request.query_params.get('status')
         search_term = request.query_params.get('search', '')
@@ -268,30 +472,97 @@ class OrderItemViewSet(viewsets.ModelViewSet):
             orders = orders.filter(status=status_filter)
         
         if search_term:
-            orders = orders.filter(
-                Q(customer_name__icontains=search_term) |
-                Q(id__icontains=search_term) |
-                Q(items__cached_item_name__icontains=search_term) |
-                Q(items__menu_item__name__icontains=search_term)
-            ).distinct()
-        
-        grouped_data = []
-        for order in orders:
-            if order.items.exists():
-                # Pass request context to serializer
+            # Customer and item names come from the order's full-text index entry
+            matches = search_queryset(
+                orders, {'pk': (ORDER_INDEX, ['customer_name', 'item_names'])}, search_term.split()
+            )
+            # An order number ('#ABCD1234') is looked up on its unique index
+            code = parse_order_code(search_term)
+            orders = matches | orders.filter(code=code) if code else matches
+        
+        # Newest orders first; ?cursor= walks the created_at index with no OFFSET or COUNT
+        paginator = KeysetPagination(['-created_at', '-id'], api_settings.PAGE_SIZE)
+        page = paginator.paginate_queryset(orders, request, view=self)
+        
+        # One context for the whole response so the menu item memo is shared across orders
+        context = self.get_serializer_context()
+        
+        def stream():
+            yield '{"next": %s, "previous": %s, "results": [' % (
+                json.dumps(paginator.get_next_link()),
+                json.dumps(paginator.get_previous_link()),
+            )
+            for index, order in enumerate(page):
+                # Items come from the prefetch cache
                 serializer = OrderItemSerializer(
                     order.items.all(), 
                     many=True, 
-                    context={'request': request}
+                    context=context
                 )
-                grouped_data.append({
+                group = {
                     'order': {
-                        'id': order.id.hex[:8],
+                        'id': order.code,
                         'customer_name': order.customer_name,
                         'total_amount': order.total_amount,
                         'status': order.status
                     },
                     'items': serializer.data
-                })
+                }
+                yield (',' if index else '') + json.dumps(group, cls=JSONEncoder)
+            yield ']}'
         
-        return Response(grouped_data)
\ No newline at end of file
+        return StreamingHttpResponse(stream(), content_type='application/json')
+
+def requested_last_event_id(request):
+    """The id a reconnecting screen resumes after (Last-Event-ID header or ?last_event_id=)"""
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+@require_GET
+async def order_events(request):
+    """
+    Server-sent events for kitchen and admin screens: ``order.created`` and
+    ``order.status`` as they happen, instead of polling the list and stats.
+    
+    A screen resumes after its Last-Event-ID and only receives the deltas; if it
+    fell further behind than the broker keeps, a ``reset`` event tells it to
+    reload the list first. Streams end after ORDER_EVENTS_STREAM_SECONDS and the
+    browser reconnects. Under WSGI each request returns what is pending (waiting
+    up to one heartbeat) and ends, so EventSource degrades to long polling.
+    """
+    broker = get_broker()
+    start_id = requested_last_event_id(request)
+    if start_id is None:
+        start_id = await asyncio.to_thread(broker.last_id)
+    streaming = isinstance(request, ASGIRequest)
+    
+    async def events():
+        last_id = start_id
+        deadline = time.monotonic() + settings.ORDER_EVENTS_STREAM_SECONDS
+        yield f"retry: {settings.ORDER_EVENTS_RETRY_MS}\n\n"
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            batch, complete = await broker.wait(last_id, min(settings.ORDER_EVENTS_HEARTBEAT, remaining))
+            if not complete:
+                yield "event: reset\ndata: {}\n\n"
+            for event in batch:
+                yield format_sse(event)
+                last_id = event['id']
+            if complete and not batch:
+                # Comment line - keeps proxies from closing an idle stream
+                yield ": keep-alive\n\n"
+            if not streaming:
+                return
+    
+    if streaming:
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    else:
+        response = HttpResponse(''.join([chunk async for chunk in events()]), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -1,8 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ReservationsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reservations'
 
-
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .search import RESERVATION_INDEX
+        # Rebuilding a table on SQLite drops the full-text triggers; put them back after migrating
+        post_migrate.connect(RESERVATION_INDEX.repair, sender=self, weak=False, dispatch_uid='reservations.reservation_index')
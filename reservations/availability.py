@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .cache import availability_cache_key
+from .models import Reservation
+from .slots import slot_for, slot_times
+
+# Longest date range a single grid request may cover
+MAX_GRID_DAYS = 31
+
+
+def build_day_grids(dates):
+    """
+    Remaining capacity for every slot of the given dates, from one grouped
+    aggregation that walks the (reservation_date, reservation_time) index.
+    """
+    capacity = settings.RESERVATION_CAPACITY
+    times = slot_times()
+    booked = {date: {start: [0, 0] for start in times} for date in dates}
+
+    rows = (
+        Reservation.objects
+        .filter(reservation_date__in=dates, status__in=Reservation.ACTIVE_STATUSES)
+        .order_by()
+        .values('reservation_date', 'reservation_time')
+        .annotate(guests=Sum('number_of_guests'), reservations=Count('id'))
+    )
+    for row in rows:
+        slot = booked[row['reservation_date']][slot_for(row['reservation_time'], times)]
+        slot[0] += row['guests']
+        slot[1] += row['reservations']
+
+    grids = {}
+    for date in dates:
+        slots = []
+        for start in times:
+            guests, reservations = booked[date][start]
+            available_seats = max(capacity - guests, 0)
+            slots.append({
+                'time': start.strftime('%H:%M'),
+                'available_seats': available_seats,
+                'is_available': available_seats > 0,
+                'existing_reservations': reservations,
+            })
+        grids[date] = {'date': date.isoformat(), 'capacity': capacity, 'slots': slots}
+    return grids
+
+
+def day_grids(start, end):
+    """Day grids from ``start`` to ``end`` inclusive, serving cached dates from the cache"""
+    dates = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    keys = {availability_cache_key(date): date for date in dates}
+
+    cached = cache.get_many(keys)
+    grids = {keys[key]: grid for key, grid in cached.items()}
+
+    missing = [date for date in dates if date not in grids]
+    if missing:
+        fresh = build_day_grids(missing)
+        cache.set_many(
+            {availability_cache_key(date): grid for date, grid in fresh.items()},
+            settings.RESERVATION_AVAILABILITY_CACHE_TIMEOUT
+        )
+        grids.update(fresh)
+
+    return [grids[date] for date in dates]
@@ -0,0 +1,13 @@
+from django.core.cache import cache
+from django.db import transaction
+
+
+def availability_cache_key(date):
+    return f'reservations:availability:{date.isoformat()}'
+
+
+def invalidate_availability(*dates):
+    """Drop the cached day grids for the given dates once the change is committed"""
+    keys = [availability_cache_key(date) for date in set(dates) if date]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
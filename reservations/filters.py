@@ -1,9 +1,11 @@
 import django_filters
+from kulan_backend.search import full_text_filter
 from .models import Reservation
+from .search import RESERVATION_INDEX
 
 class ReservationFilter(django_filters.FilterSet):
-    customer_name = django_filters.CharFilter(lookup_expr='icontains')
-    customer_email = django_filters.CharFilter(lookup_expr='icontains')
+    customer_name = django_filters.CharFilter(method=full_text_filter(RESERVATION_INDEX, 'customer_name'))
+    customer_email = django_filters.CharFilter(method=full_text_filter(RESERVATION_INDEX, 'customer_email'))
     reservation_date = django_filters.DateFilter()
     reservation_date_from = django_filters.DateFilter(field_name='reservation_date', lookup_expr='gte')
     reservation_date_to = django_filters.DateFilter(field_name='reservation_date', lookup_expr='lte')
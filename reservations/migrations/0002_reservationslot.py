@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:17
+
+from django.db import migrations, models
+
+
+def populate_slots(apps, schema_editor):
+    Reservation = apps.get_model('reservations', 'Reservation')
+    ReservationSlot = apps.get_model('reservations', 'ReservationSlot')
+    
+    rows = Reservation.objects.filter(status__in=['pending', 'confirmed']).order_by().values(
+        'reservation_date', 'reservation_time'
+    ).annotate(guests=models.Sum('number_of_guests'), reservations=models.Count('id'))
+    
+    ReservationSlot.objects.bulk_create([
+        ReservationSlot(
+            date=row['reservation_date'], time=row['reservation_time'],
+            guests=row['guests'], reservations=row['reservations']
+        )
+        for row in rows
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('time', models.TimeField()),
+                ('guests', models.IntegerField(default=0)),
+                ('reservations', models.IntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['date', 'time'],
+                'unique_together': {('date', 'time')},
+            },
+        ),
+        migrations.RunPython(populate_slots, migrations.RunPython.noop),
+    ]
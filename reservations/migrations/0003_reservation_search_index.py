@@ -0,0 +1,25 @@
+from django.db import migrations
+
+from kulan_backend.search import FullTextIndex
+
+# Frozen copy of reservations.search.RESERVATION_INDEX
+RESERVATION_INDEX = FullTextIndex(
+    'reservations_reservation_search', 'reservations.Reservation', 'reservations_reservation',
+    columns={
+        'customer_name': 'customer_name',
+        'customer_email': 'customer_email',
+        'customer_phone': 'customer_phone',
+        'special_requests': 'special_requests',
+    },
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0002_reservationslot'),
+    ]
+
+    operations = [
+        migrations.RunPython(RESERVATION_INDEX.create, RESERVATION_INDEX.drop),
+    ]
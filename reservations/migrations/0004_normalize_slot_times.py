@@ -0,0 +1,38 @@
+from collections import defaultdict
+
+from django.db import migrations, models
+
+from reservations.slots import slot_start
+
+
+def fold_into_slot_starts(apps, schema_editor):
+    """Counters were keyed on the exact booking time; rebuild them per slot start"""
+    Reservation = apps.get_model('reservations', 'Reservation')
+    ReservationSlot = apps.get_model('reservations', 'ReservationSlot')
+    
+    rows = Reservation.objects.filter(status__in=['pending', 'confirmed']).order_by().values(
+        'reservation_date', 'reservation_time'
+    ).annotate(guests=models.Sum('number_of_guests'), reservations=models.Count('id'))
+    
+    slots = defaultdict(lambda: [0, 0])
+    for row in rows:
+        slot = slots[(row['reservation_date'], slot_start(row['reservation_time']))]
+        slot[0] += row['guests']
+        slot[1] += row['reservations']
+    
+    ReservationSlot.objects.all().delete()
+    ReservationSlot.objects.bulk_create([
+        ReservationSlot(date=date, time=time, guests=guests, reservations=reservations)
+        for (date, time), (guests, reservations) in slots.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservations', '0003_reservation_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(fold_into_slot_starts, migrations.RunPython.noop),
+    ]
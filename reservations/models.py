@@ -1,8 +1,129 @@
 # reservations\models.py
-from django.db import models
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections, models, router, transaction
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
 
+from .cache import invalidate_availability
+from .slots import slot_start
+
+@contextmanager
+def booking_transaction(using):
+    """
+    An atomic block that, on SQLite, starts with BEGIN IMMEDIATE.
+    
+    A deferred transaction that reads before writing cannot upgrade its lock
+    while another booking holds the write lock and fails with "database is
+    locked" rather than waiting. Taking the lock up front makes concurrent
+    bookings queue on the busy timeout; every other transaction keeps the
+    connection's own mode.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite' or connection.in_atomic_block:
+        with transaction.atomic(using=using):
+            yield
+        return
+    connection.ensure_connection()
+    mode = connection.transaction_mode
+    connection.transaction_mode = 'IMMEDIATE'
+    try:
+        with transaction.atomic(using=using):
+            yield
+    finally:
+        connection.transaction_mode = mode
+
+FULLY_BOOKED_MESSAGE = "This time is fully booked. Please choose another time."
+
+class SlotUnavailable(Exception):
+    """Raised when a booking would take its slot past the restaurant's capacity"""
+
+class ReservationSlot(models.Model):
+    """
+    Seats held in one date/time slot by pending and confirmed reservations.
+    
+    Rows are keyed on the slot's start (see reservations.slots), so bookings
+    at 19:00 and 19:05 share the 19:00 slot and its capacity.
+    """
+    date = models.DateField()
+    time = models.TimeField()
+    guests = models.IntegerField(default=0)
+    reservations = models.IntegerField(default=0)
+    
+    class Meta:
+        ordering = ['date', 'time']
+        unique_together = ['date', 'time']
+    
+    def __str__(self):
+        return f"{self.date} {self.time}: {self.guests} guests"
+    
+    @classmethod
+    def adjust(cls, date, time, guests, reservations):
+        """Atomically add (or remove) guests and reservations for the slot ``time`` falls in"""
+        slot, _ = cls.objects.get_or_create(date=date, time=slot_start(time))
+        cls.objects.filter(pk=slot.pk).update(
+            guests=models.F('guests') + guests,
+            reservations=models.F('reservations') + reservations
+        )
+    
+    @classmethod
+    def reserve(cls, date, time, guests, capacity):
+        """
+        Take seats in a slot only if it stays within capacity.
+        
+        The capacity check and the increment are one conditional UPDATE, so
+        concurrent bookings cannot both read the same free seats; the loser
+        simply matches no row. Returns False when the slot is full.
+        """
+        slot, _ = cls.objects.get_or_create(date=date, time=slot_start(time))
+        return cls.objects.filter(pk=slot.pk, guests__lte=capacity - guests).update(
+            guests=models.F('guests') + guests,
+            reservations=models.F('reservations') + 1
+        ) == 1
+    
+    @classmethod
+    def has_room(cls, previous, current, capacity):
+        """
+        Whether moving a reservation from ``previous`` to ``current`` fits the
+        capacity. A read-only pre-check for forms; reserve() still decides.
+        """
+        previous, current = cls.normalize(previous), cls.normalize(current)
+        if not current or previous == current:
+            return True
+        slot = cls.objects.filter(date=current[0], time=current[1]).first()
+        held = slot.guests if slot else 0
+        if previous and previous[:2] == current[:2]:
+            # Seats this reservation already holds in the slot
+            held -= previous[2]
+        return held + current[2] <= capacity
+    
+    @staticmethod
+    def normalize(booking):
+        """A (date, time, guests) booking with the time replaced by its slot's start"""
+        return booking and (booking[0], slot_start(booking[1]), booking[2])
+    
+    @classmethod
+    def move(cls, previous, current, capacity=None):
+        """
+        Move a reservation's seats from its previous booking to its current one.
+        
+        With a ``capacity`` the current slot is only taken if it has room,
+        otherwise SlotUnavailable is raised (callers run this in a transaction,
+        so the released seats are restored).
+        """
+        if cls.normalize(previous) == cls.normalize(current):
+            return
+        invalidate_availability(previous and previous[0], current and current[0])
+        if previous:
+            cls.adjust(previous[0], previous[1], -previous[2], -1)
+        if current:
+            if capacity is None:
+                cls.adjust(current[0], current[1], current[2], 1)
+            elif not cls.reserve(current[0], current[1], current[2], capacity):
+                raise SlotUnavailable(f"No table for {current[2]} guests at {current[1]} on {current[0]}")
+
 class Reservation(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -11,6 +132,10 @@ class Reservation(models.Model):
         ('cancelled', 'Cancelled'),
     ]
     
+    # Statuses that hold seats in their slot
+    ACTIVE_STATUSES = ['pending', 'confirmed']
+    BOOKING_FIELDS = {'reservation_date', 'reservation_time', 'number_of_guests', 'status'}
+    
     customer_name = models.CharField(max_length=255)
     customer_email = models.EmailField()
     customer_phone = models.CharField(max_length=20)
@@ -35,6 +160,49 @@ class Reservation(models.Model):
     def __str__(self):
         return f"{self.customer_name} - {self.reservation_date} {self.reservation_time}"
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the seats held as loaded, so save() can move them between slots
+        if cls.BOOKING_FIELDS <= set(field_names):
+            instance._booked = instance.booking()
+        return instance
+    
+    def booking(self):
+        """The (date, time, guests) this reservation holds, or None when it holds no seats"""
+        if self.status not in self.ACTIVE_STATUSES:
+            return None
+        # Field values assigned as strings are only converted on the way back from the database
+        date = self._meta.get_field('reservation_date').to_python(self.reservation_date)
+        time = self._meta.get_field('reservation_time').to_python(self.reservation_time)
+        return (date, time, self.number_of_guests)
+    
+    def loaded_booking(self):
+        """The booking as last loaded from or saved to the database"""
+        if hasattr(self, '_booked'):
+            return self._booked
+        if self._state.adding:
+            return None
+        stored = Reservation.objects.filter(pk=self.pk).first()
+        return stored.booking() if stored else None
+    
+    def clean(self):
+        # Lets forms such as the admin report a full slot; save() enforces it either way
+        current = self.booking()
+        if current and None not in current and not ReservationSlot.has_room(
+            self.loaded_booking(), current, settings.RESERVATION_CAPACITY
+        ):
+            raise ValidationError({'reservation_time': FULLY_BOOKED_MESSAGE})
+    
+    def save(self, *args, **kwargs):
+        previous = self.loaded_booking()
+        using = kwargs.get('using') or router.db_for_write(Reservation, instance=self)
+        with booking_transaction(using):
+            super().save(*args, **kwargs)
+            current = self.booking()
+            ReservationSlot.move(previous, current, capacity=settings.RESERVATION_CAPACITY)
+        self._booked = current
+    
     def is_past_due(self):
         """Check if reservation date/time has passed"""
         from django.utils import timezone
@@ -0,0 +1,11 @@
+from kulan_backend.search import FullTextIndex
+
+RESERVATION_INDEX = FullTextIndex(
+    'reservations_reservation_search', 'reservations.Reservation', 'reservations_reservation',
+    columns={
+        'customer_name': 'customer_name',
+        'customer_email': 'customer_email',
+        'customer_phone': 'customer_phone',
+        'special_requests': 'special_requests',
+    },
+)
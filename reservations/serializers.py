@@ -1,9 +1,10 @@
 # reservations\serializers.py
 from rest_framework import serializers
-from .models import Reservation
+from .models import FULLY_BOOKED_MESSAGE, Reservation, SlotUnavailable
 from django.utils import timezone
 from datetime import datetime, time
 
+
 class ReservationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Reservation
@@ -52,4 +53,16 @@ class ReservationSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("Number of guests must be at least 1.")
         if value > 20:
             raise serializers.ValidationError("For groups larger than 20, please call us directly.")
-        return value
\ No newline at end of file
+        return value
+    
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except SlotUnavailable:
+            raise serializers.ValidationError({'reservation_time': FULLY_BOOKED_MESSAGE})
+    
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except SlotUnavailable:
+            raise serializers.ValidationError({'reservation_time': FULLY_BOOKED_MESSAGE})
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .models import Reservation, ReservationSlot
+
+
+@receiver(post_delete, sender=Reservation)
+def release_slot(sender, instance, **kwargs):
+    # Covers queryset deletes too, which bypass Reservation.delete()
+    ReservationSlot.move(instance.loaded_booking(), None)
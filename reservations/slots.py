@@ -0,0 +1,31 @@
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.utils.dateparse import parse_time
+
+
+def slot_times():
+    """Start times of every bookable slot between opening and closing"""
+    opening = datetime.combine(datetime.min, parse_time(settings.RESERVATION_OPENING_TIME))
+    closing = datetime.combine(datetime.min, parse_time(settings.RESERVATION_CLOSING_TIME))
+    step = timedelta(minutes=settings.RESERVATION_SLOT_MINUTES)
+    times = []
+    while opening < closing:
+        times.append(opening.time())
+        opening += step
+    return times
+
+
+def slot_for(time, times):
+    """The grid slot a booking time falls into (bookings before opening count in the first)"""
+    current = times[0]
+    for start in times:
+        if start > time:
+            break
+        current = start
+    return current
+
+
+def slot_start(time):
+    """The start of the slot ``time`` is booked under, e.g. 19:05 -> 19:00 with 15 minute slots"""
+    return slot_for(time, slot_times())
@@ -1,3 +1,311 @@
-from django.test import TestCase
+import threading
+from datetime import timedelta
 
-# Create your tests here.
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+from rest_framework.test import APIClient
+
+from users.models import CustomUser
+from .models import Reservation, ReservationSlot
+
+
+def booking_payload(date, guests=4, time='19:00', **kwargs):
+    payload = {
+        'customer_name': 'Test Guest',
+        'customer_email': 'guest@example.com',
+        'customer_phone': '0700000000',
+        'reservation_date': date.isoformat(),
+        'reservation_time': time,
+        'number_of_guests': guests,
+    }
+    payload.update(kwargs)
+    return payload
+
+
+class ReservationSlotTests(TestCase):
+    """The slot counter follows every booking change"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.date = timezone.now().date() + timedelta(days=7)
+
+    def book(self, guests=4, time='19:00'):
+        payload = booking_payload(self.date, guests, time)
+        payload.update(reservation_date=self.date, reservation_time=parse_time(time))
+        return Reservation.objects.create(**payload)
+
+    def slot(self, time='19:00'):
+        slot = ReservationSlot.objects.filter(date=self.date, time=parse_time(time)).first()
+        return (slot.guests, slot.reservations) if slot else (0, 0)
+
+    def test_counter_follows_bookings(self):
+        first = self.book(4)
+        self.book(2)
+        self.assertEqual(self.slot(), (6, 2))
+
+        first.number_of_guests = 5
+        first.save()
+        self.assertEqual(self.slot(), (7, 2))
+
+        first.reservation_time = parse_time('20:00')
+        first.save()
+        self.assertEqual(self.slot(), (2, 1))
+        self.assertEqual(self.slot('20:00'), (5, 1))
+
+        first.status = 'cancelled'
+        first.save()
+        self.assertEqual(self.slot('20:00'), (0, 0))
+
+        # Completed and cancelled bookings no longer hold seats, re-activating takes them back
+        first.status = 'confirmed'
+        first.save()
+        self.assertEqual(self.slot('20:00'), (5, 1))
+
+    def test_deletes_release_seats(self):
+        self.book(4)
+        other = self.book(3)
+        other.delete()
+        self.assertEqual(self.slot(), (4, 1))
+
+        Reservation.objects.all().delete()
+        self.assertEqual(self.slot(), (0, 0))
+
+    def test_availability_reads_the_counter(self):
+        self.book(8)
+        with self.assertNumQueries(1):
+            response = self.client.get(
+                '/api/reservations/reservations/availability/', {'date': self.date.isoformat(), 'time': '19:00'}
+            )
+        availability = response.json()
+        self.assertEqual(availability['available_seats'], settings.RESERVATION_CAPACITY - 8)
+        self.assertEqual(availability['existing_reservations'], 1)
+
+        day = self.client.get('/api/reservations/reservations/availability/', {'date': self.date.isoformat()}).json()
+        self.assertEqual([slot['existing_reservations'] for slot in day['slots']], [1])
+
+    def test_invalid_date_or_time_is_refused(self):
+        for params in ({}, {'date': 'soon'}, {'date': '2026-13-01'}, {'date': self.date.isoformat(), 'time': '25:00'}):
+            response = self.client.get('/api/reservations/reservations/availability/', params)
+            self.assertEqual(response.status_code, 400, params)
+
+
+@override_settings(
+    RESERVATION_CAPACITY=10, RESERVATION_OPENING_TIME='18:00',
+    RESERVATION_CLOSING_TIME='20:00', RESERVATION_SLOT_MINUTES=30,
+)
+class AvailabilityGridTests(TestCase):
+    """The day grid buckets bookings into slots and is cached per day"""
+
+    URL = '/api/reservations/reservations/availability-grid/'
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.date = timezone.now().date() + timedelta(days=7)
+
+    def book(self, guests, time, date=None):
+        response = self.client.post(
+            '/api/reservations/reservations/', booking_payload(date or self.date, guests, time), format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def grid(self, start, end=None):
+        params = {'start': start.isoformat()}
+        if end:
+            params['end'] = end.isoformat()
+        return self.client.get(self.URL, params)
+
+    def test_grid_counts_bookings_per_slot(self):
+        self.book(4, '18:30')
+        self.book(6, '19:00')
+        next_day = self.date + timedelta(days=1)
+        self.book(2, '18:00', next_day)
+
+        with self.assertNumQueries(1):
+            days = self.grid(self.date, next_day).json()['days']
+
+        self.assertEqual([day['date'] for day in days], [self.date.isoformat(), next_day.isoformat()])
+        self.assertEqual(
+            [(slot['time'], slot['available_seats'], slot['existing_reservations']) for slot in days[0]['slots']],
+            [('18:00', 10, 0), ('18:30', 6, 1), ('19:00', 4, 1), ('19:30', 10, 0)]
+        )
+        self.assertEqual(days[1]['slots'][0]['available_seats'], 8)
+
+    def test_cached_grid_is_dropped_on_booking(self):
+        self.grid(self.date)
+        with self.assertNumQueries(0):
+            self.grid(self.date)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(10, '19:30')
+        slots = self.grid(self.date).json()['days'][0]['slots']
+        self.assertFalse(slots[-1]['is_available'])
+
+    def test_invalid_ranges_are_refused(self):
+        self.assertEqual(self.client.get(self.URL).status_code, 400)
+        self.assertEqual(self.grid(self.date, self.date - timedelta(days=1)).status_code, 400)
+        self.assertEqual(self.grid(self.date, self.date + timedelta(days=31)).status_code, 400)
+        self.assertEqual(self.grid(self.date, self.date + timedelta(days=30)).status_code, 200)
+        self.assertEqual(self.client.get(self.URL, {'start': '2026-02-30'}).status_code, 400)
+        self.assertEqual(self.client.get(self.URL, {'start': self.date.isoformat(), 'end': '2026-13-01'}).status_code, 400)
+
+
+class ReservationKeysetPaginationTests(TestCase):
+    """?cursor= seeks on the full (date, time, id) key, however many rows share a slot"""
+
+    URL = '/api/reservations/reservations/'
+
+    def setUp(self):
+        self.client = APIClient()
+        today = timezone.now().date()
+        for days in (3, 2, 2, 2, 2, 1):
+            for time in ('19:00', '19:00', '18:00'):
+                payload = booking_payload(today + timedelta(days=days), 1, time)
+                payload.update(reservation_date=today + timedelta(days=days), reservation_time=parse_time(time))
+                Reservation.objects.create(**payload)
+        self.expected = list(Reservation.objects.order_by(
+            '-reservation_date', '-reservation_time', '-id'
+        ).values_list('id', flat=True))
+
+    def test_pages_cover_every_row_once_without_offset(self):
+        page = self.client.get(self.URL, {'cursor': '', 'page_size': 4}).json()
+        self.assertIsNone(page['previous'])
+        pages = [page]
+        while page['next']:
+            with CaptureQueriesContext(connection) as queries:
+                page = self.client.get(page['next']).json()
+            self.assertNotIn('OFFSET', queries[-1]['sql'])
+            pages.append(page)
+        seen = [row['id'] for page in pages for row in page['results']]
+        self.assertEqual(seen, self.expected)
+
+        # Walking back from the last page returns the same pages
+        back = self.client.get(pages[-1]['previous']).json()
+        self.assertEqual(back['results'], pages[-2]['results'])
+        first = self.client.get(pages[1]['previous']).json()
+        self.assertEqual(first['results'], pages[0]['results'])
+        self.assertIsNone(first['previous'])
+
+    def test_invalid_cursor_is_not_found(self):
+        self.assertEqual(self.client.get(self.URL, {'cursor': 'nonsense'}).status_code, 404)
+
+
+@override_settings(RESERVATION_CAPACITY=10)
+class ReservationCapacityTests(TestCase):
+    """Bookings are refused once their slot is full"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.date = timezone.now().date() + timedelta(days=7)
+
+    def test_booking_past_capacity_is_refused(self):
+        first = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 6), format='json')
+        self.assertEqual(first.status_code, 201)
+
+        full = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 5), format='json')
+        self.assertEqual(full.status_code, 400)
+        self.assertIn('reservation_time', full.json())
+
+        fits = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 4), format='json')
+        self.assertEqual(fits.status_code, 201)
+
+        slot = ReservationSlot.objects.get(date=self.date)
+        self.assertEqual((slot.guests, slot.reservations), (10, 2))
+        self.assertEqual(Reservation.objects.count(), 2)
+
+    def test_off_grid_times_share_their_slot(self):
+        first = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 8), format='json')
+        self.assertEqual(first.status_code, 201)
+
+        # 19:05 falls in the 19:00 slot, which only has two seats left
+        off_grid = self.client.post(
+            '/api/reservations/reservations/', booking_payload(self.date, 8, time='19:05'), format='json'
+        )
+        self.assertEqual(off_grid.status_code, 400)
+        fits = self.client.post(
+            '/api/reservations/reservations/', booking_payload(self.date, 2, time='19:10'), format='json'
+        )
+        self.assertEqual(fits.status_code, 201)
+
+        slot = ReservationSlot.objects.get(date=self.date)
+        self.assertEqual((str(slot.time), slot.guests, slot.reservations), ('19:00:00', 10, 2))
+        availability = self.client.get(
+            '/api/reservations/reservations/availability/', {'date': self.date.isoformat(), 'time': '19:14'}
+        ).json()
+        self.assertFalse(availability['is_available'])
+
+        # Moving within the slot keeps the seats where they are
+        moved = self.client.patch(
+            f"/api/reservations/reservations/{fits.json()['id']}/", {'reservation_time': '19:00'}, format='json'
+        )
+        self.assertEqual(moved.status_code, 200)
+        slot.refresh_from_db()
+        self.assertEqual((slot.guests, slot.reservations), (10, 2))
+
+    def test_admin_edit_past_capacity_is_a_form_error(self):
+        self.client.post('/api/reservations/reservations/', booking_payload(self.date, 6), format='json')
+        small = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 2), format='json')
+        admin = CustomUser.objects.create_superuser(username='admin', email='admin@example.com', password='x')
+        self.client.force_login(admin)
+
+        def edit(guests):
+            return self.client.post(f"/admin/reservations/reservation/{small.json()['id']}/change/", {
+                **booking_payload(self.date, guests), 'status': 'pending', 'special_requests': '',
+            })
+
+        response = edit(5)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('reservation_time', response.context['adminform'].form.errors)
+        self.assertEqual(ReservationSlot.objects.get(date=self.date).guests, 8)
+
+        # Growing within the free seats is fine; its own two seats count as free
+        self.assertEqual(edit(4).status_code, 302)
+        self.assertEqual(ReservationSlot.objects.get(date=self.date).guests, 10)
+
+    def test_cancelling_frees_the_seats(self):
+        booked = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 10), format='json')
+        self.client.post(f"/api/reservations/reservations/{booked.json()['id']}/cancel/")
+
+        response = self.client.post('/api/reservations/reservations/', booking_payload(self.date, 10), format='json')
+        self.assertEqual(response.status_code, 201)
+
+
+@override_settings(RESERVATION_CAPACITY=20)
+class ConcurrentBookingTests(TransactionTestCase):
+    """Parallel bookings for one slot must never overbook it"""
+
+    THREADS = 16
+    GUESTS = 3
+
+    def test_parallel_bookings_stay_within_capacity(self):
+        date = timezone.now().date() + timedelta(days=7)
+        barrier = threading.Barrier(self.THREADS)
+        statuses = []
+
+        def book():
+            try:
+                barrier.wait()
+                response = APIClient().post(
+                    '/api/reservations/reservations/', booking_payload(date, self.GUESTS), format='json'
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=book) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # 20 seats fit six parties of three; everyone else is turned away
+        self.assertEqual(statuses.count(201), 6)
+        self.assertEqual(statuses.count(400), self.THREADS - 6)
+        slot = ReservationSlot.objects.get(date=date)
+        self.assertEqual((slot.guests, slot.reservations), (18, 6))
+        self.assertEqual(Reservation.objects.filter(status='pending').count(), 6)
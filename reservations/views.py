@@ -3,19 +3,28 @@ from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter, OrderingFilter
-from .models import Reservation
+from rest_framework.filters import OrderingFilter
+from django.conf import settings
+from django.utils.dateparse import parse_date, parse_time
+from kulan_backend.search import FullTextSearchFilter
+from .models import Reservation, ReservationSlot
+from .availability import MAX_GRID_DAYS, day_grids
+from .slots import slot_start
 from .serializers import ReservationSerializer
 from .filters import ReservationFilter
+from .search import RESERVATION_INDEX
 
 class ReservationViewSet(viewsets.ModelViewSet):
     queryset = Reservation.objects.all()
     serializer_class = ReservationSerializer
-    filter_backends = [DjangoFilterBackend, SearchFilter, OrderingFilter]
+    filter_backends = [DjangoFilterBackend, FullTextSearchFilter, OrderingFilter]
     filterset_class = ReservationFilter
     search_fields = ['customer_name', 'customer_email', 'customer_phone', 'special_requests']
+    search_indexes = {'pk': RESERVATION_INDEX}
     ordering_fields = ['reservation_date', 'reservation_time', 'created_at']
     ordering = ['-reservation_date', '-reservation_time']
+    # ?cursor= pages along the (reservation_date, reservation_time) index
+    cursor_ordering = ['-reservation_date', '-reservation_time', '-id']
     
     # Allow public access to ALL reservation operations
     permission_classes = [permissions.AllowAny]
@@ -95,61 +104,118 @@ class ReservationViewSet(viewsets.ModelViewSet):
     
     @action(detail=False, methods=['get'])
     def availability(self, request):
-        """Check availability for a specific date and time"""
-        date = request.query_params.get('date')
-        time = request.query_params.get('time')
-        
-        if not date or not time:
+        """Check availability for a specific date and time, or every booked slot of a date"""
+        time_param = request.query_params.get('time')
+        try:
+            date = parse_date(request.query_params.get('date') or '')
+            time = parse_time(time_param) if time_param else None
+        except ValueError:
+            # Well-formed but out of range, e.g. 2026-13-01 or 25:00
+            date = time = None
+        
+        if not date or (time_param and not time):
             return Response(
-                {'error': 'Both date and time parameters are required.'},
+                {'error': 'A valid date (YYYY-MM-DD) is required; time (HH:MM) is optional.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # Check if there are existing reservations for the same date and time
-        existing_reservations = Reservation.objects.filter(
-            reservation_date=date,
-            reservation_time=time,
-            status__in=['pending', 'confirmed']
-        )
-        
-        total_guests = sum(reservation.number_of_guests for reservation in existing_reservations)
+        capacity = settings.RESERVATION_CAPACITY
         
-        # Assuming restaurant capacity - adjust as needed
-        restaurant_capacity = 50
-        available_seats = restaurant_capacity - total_guests
+        if time:
+            # One indexed lookup on the slot counter instead of summing reservations
+            slot = ReservationSlot.objects.filter(date=date, time=slot_start(time)).first()
+            return Response(slot_availability(date, time, slot, capacity))
         
+        # Whole day: every slot that holds seats, in a single query
+        slots = ReservationSlot.objects.filter(date=date, reservations__gt=0)
         return Response({
             'date': date,
-            'time': time,
-            'available_seats': available_seats,
-            'is_available': available_seats > 0,
-            'existing_reservations': existing_reservations.count()
+            'capacity': capacity,
+            'slots': [slot_availability(date, slot.time, slot, capacity) for slot in slots]
         })
 
+    @action(detail=False, methods=['get'], url_path='availability-grid')
+    def availability_grid(self, request):
+        """Remaining capacity of every slot for each date from ``start`` to ``end`` (inclusive)"""
+        end_param = request.query_params.get('end')
+        try:
+            start = parse_date(request.query_params.get('start') or '')
+            end = parse_date(end_param) if end_param else start
+        except ValueError:
+            # Well-formed but not a real day, e.g. 2026-02-30
+            start = end = None
+        
+        if not start or not end or end < start:
+            return Response(
+                {'error': 'A valid start date (YYYY-MM-DD) is required; end must not be before start.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if (end - start).days >= MAX_GRID_DAYS:
+            return Response(
+                {'error': f'A grid covers at most {MAX_GRID_DAYS} days.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        return Response({'days': day_grids(start, end)})
+
+def slot_availability(date, time, slot, capacity):
+    """Availability payload for one slot (``slot`` may be None when nothing is booked)"""
+    booked_guests = slot.guests if slot else 0
+    available_seats = capacity - booked_guests
+    return {
+        'date': date,
+        'time': time,
+        'available_seats': available_seats,
+        'is_available': available_seats > 0,
+        'existing_reservations': slot.reservations if slot else 0
+    }
+
 # Additional view for dashboard statistics
 from rest_framework.views import APIView
+from django.core.cache import cache
 from django.db.models import Count, Q
 from django.utils import timezone
 
+def reservation_stats(now):
+    """Dashboard counters in a single conditional-aggregation query"""
+    today = now.date()
+    upcoming = (
+        Q(reservation_date__gt=today) |
+        Q(reservation_date=today, reservation_time__gte=now.time())
+    ) & Q(status__in=Reservation.ACTIVE_STATUSES)
+    
+    aggregates = {
+        'total_reservations': Count('id'),
+        'today_reservations': Count('id', filter=Q(reservation_date=today)),
+        'upcoming_reservations': Count('id', filter=upcoming),
+    }
+    for value, _ in Reservation.STATUS_CHOICES:
+        aggregates[f'status_{value}'] = Count('id', filter=Q(status=value))
+    
+    totals = Reservation.objects.order_by().aggregate(**aggregates)
+    
+    return {
+        'total_reservations': totals['total_reservations'],
+        'today_reservations': totals['today_reservations'],
+        'pending_reservations': totals['status_pending'],
+        'upcoming_reservations': totals['upcoming_reservations'],
+        'status_distribution': [
+            {'status': value, 'count': totals[f'status_{value}']}
+            for value, _ in Reservation.STATUS_CHOICES if totals[f'status_{value}']
+        ],
+    }
+
 class ReservationStatsView(APIView):
     # Allow public access to stats as well (or keep admin-only if preferred)
     permission_classes = [permissions.AllowAny]
     
     def get(self, request):
-        today = timezone.now().date()
-        
-        stats = {
-            'total_reservations': Reservation.objects.count(),
-            'today_reservations': Reservation.objects.filter(reservation_date=today).count(),
-            'pending_reservations': Reservation.objects.filter(status='pending').count(),
-            'upcoming_reservations': Reservation.objects.filter(
-                Q(reservation_date__gt=today) |
-                Q(reservation_date=today, reservation_time__gte=timezone.now().time()),
-                status__in=['pending', 'confirmed']
-            ).count(),
-            'status_distribution': Reservation.objects.values('status').annotate(
-                count=Count('id')
-            )
-        }
-        
-        return Response(stats)
\ No newline at end of file
+        # Public and polled - every caller shares one short-lived snapshot per day
+        now = timezone.localtime()
+        cache_key = f"reservations:stats:{now.date().isoformat()}"
+        stats = cache.get(cache_key)
+        if stats is None:
+            stats = reservation_stats(now)
+            cache.set(cache_key, stats, settings.RESERVATION_STATS_CACHE_TIMEOUT)
+        
+        return Response(stats)